@@ -0,0 +1 @@
+"""Benchmarks headless da simulação e da renderização (python -m benchmarks)"""
@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import argparse
+import platform
+
+from benchmarks.scenarios import SCENARIOS
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+METRICS = ("tick_ms", "frame_ms", "build_ms")  # Menor é melhor
+NOISE_FLOOR_MS = 0.05  # Diferenças absolutas abaixo disso não contam como regressão
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmarks headless do Hotline Miami 3")
+    parser.add_argument("--ticks", type=int, default=300, help="ticks medidos por cenário")
+    parser.add_argument("--frames", type=int, default=60, help="quadros medidos por cenário")
+    parser.add_argument("--only", nargs="*", default=[], help="só cenários cujo nome contém um destes trechos")
+    parser.add_argument("--output", help="gravar o relatório JSON neste arquivo (padrão: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="arquivo de referência para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="piora relativa aceita antes de acusar regressão (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="gravar os resultados como nova referência")
+    return parser.parse_args(argv)
+
+
+def compare(results, baseline, tolerance):
+    """Razão atual/referência por métrica e a lista de regressões acima da tolerância"""
+    ratios = {}
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratios[name] = {}
+        for metric in METRICS:
+            if metric not in result or not reference.get(metric):
+                continue
+            current, previous = result[metric], reference[metric]
+            ratios[name][metric] = current / previous
+            if current > previous * (1 + tolerance) and current - previous > NOISE_FLOOR_MS:
+                regressions.append({"scenario": name, "metric": metric,
+                                    "baseline": previous, "current": current})
+    return ratios, regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = [name for name in SCENARIOS if not args.only or any(part in name for part in args.only)]
+
+    results = {}
+    for name in selected:
+        print(f"{name}...", file=sys.stderr, flush=True)
+        results[name] = SCENARIOS[name](args.ticks, args.frames)
+
+    report = {
+        "meta": {"python": platform.python_version(), "pygame": pygame.version.ver, "numpy": np.__version__,
+                 "machine": platform.machine(), "ticks": args.ticks, "frames": args.frames},
+        "results": results,
+    }
+
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        report["tolerance"] = args.tolerance
+        report["ratios"], report["regressions"] = compare(results, baseline, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            baseline_file.write(text + "\n")
+        print(f"Referência gravada em {args.baseline}", file=sys.stderr)
+
+    for regression in report.get("regressions", []):
+        print(f"REGRESSÃO: {regression['scenario']} {regression['metric']} "
+              f"{regression['baseline']:.3f} -> {regression['current']:.3f} ms", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
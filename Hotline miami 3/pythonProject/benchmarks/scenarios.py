@@ -0,0 +1,206 @@
+import os
+import math
+import random
+import time
+
+# O driver headless precisa ser escolhido antes de importar o jogo; o aviso do pygame
+# sairia no stdout junto com o relatório JSON
+os.environ.setdefault("HM3_HEADLESS", "1")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from main import (CharacterType, Enemy, Game, GameState, Level, Player, PlayerState,  # noqa: E402
+                  ScriptedInput, WeaponType, PROJECTILE_POOL, GRENADE_POOL, TILE_SIZE, SCREEN_WIDTH,
+                  SCREEN_HEIGHT)
+
+LAYOUTS = ("office", "urban", "club", "warehouse", "suburban", "military")
+ENEMY_TYPES = ["guard", "heavy", "fast", "sniper"]
+INVULNERABLE = 10 ** 6  # Vida do jogador durante os ticks: a IA ataca, mas a partida não acaba
+
+
+def make_game(level_num=1, seed=1, character_type=CharacterType.VETERAN, blocks=None):
+    """Partida já em andamento num nível fixo, sem diálogos"""
+    game = Game(ScriptedInput(), seed)
+    game.projectiles.clear()
+    game.grenades.clear()
+    game.player = Player(character_type)
+    game.level_num = level_num
+    game.level = Level(level_num, character_type, 0, seed, blocks)
+    game.player.x, game.player.y = game.level.spawn_point
+    game.state = GameState.PLAYING
+    game.store_previous()
+    return game
+
+
+def add_enemies(game, count, detection_range=2000):
+    level = game.level
+    for _ in range(count):
+        x, y = level.find_valid_position(spacing=0)
+        enemy = Enemy(x, y, level.rng.choice(ENEMY_TYPES), level.enemy_batch, level.rng)
+        enemy.detection_range = detection_range
+        enemy.alerted = True  # Já sabem do jogador: mede a perseguição, não a descoberta
+        level.enemies.append(enemy)
+
+
+def measure(step, count):
+    # Média em ms por chamada
+    start = time.perf_counter()
+    for _ in range(count):
+        step()
+    return (time.perf_counter() - start) * 1000 / max(count, 1)
+
+
+def run_game(game, ticks, frames, setup=None):
+    """Mede ticks completos (Game.tick) e depois quadros (Game.draw) sobre o estado resultante"""
+    player = game.player
+
+    def step():
+        if setup:
+            setup(game)
+        player.state = PlayerState.ALIVE
+        player.health = INVULNERABLE
+        game.state = GameState.PLAYING
+        game.tick()
+
+    tick_ms = measure(step, ticks)
+    player.health = player.max_health
+    game.state = GameState.PLAYING
+    frame_ms = measure(game.draw, frames)
+    return {
+        "tick_ms": tick_ms,
+        "ticks_per_second": 1000 / tick_ms if tick_ms else 0.0,
+        "frame_ms": frame_ms,
+        "enemies": len(game.level.enemies),
+        "projectiles": len(game.projectiles),
+        "particles": len(game.blood_particles),
+    }
+
+
+def layout(index):
+    def scenario(ticks, frames):
+        # Construção completa do nível: paredes, grade, camada estática, espaço livre e inimigos
+        seeds = iter(range(1000, 2000))
+        Level.chunk_layers.clear()
+        build_ms = measure(lambda: Level(index + 1, CharacterType.VETERAN, 0, next(seeds)), 5)
+
+        result = run_game(make_game(index + 1), ticks, frames)
+        result["build_ms"] = build_ms
+        return result
+    return scenario
+
+
+def enemies(count):
+    def scenario(ticks, frames):
+        game = make_game()
+        add_enemies(game, count)
+        return run_game(game, ticks, frames)
+    return scenario
+
+
+def bullet_storm(ticks, frames, bullets=200, targets=50):
+    """Pool de projéteis sempre cheio, disparado do jogador em todas as direções"""
+    rng = random.Random(7)
+    game = make_game()
+    add_enemies(game, targets, detection_range=0)
+
+    def refill(game):
+        if len(game.level.enemies) < targets:
+            add_enemies(game, targets - len(game.level.enemies), detection_range=0)
+        cx = game.player.x + TILE_SIZE // 2
+        cy = game.player.y + TILE_SIZE // 2
+        while len(PROJECTILE_POOL) < bullets:
+            angle = rng.uniform(0, 2 * math.pi)
+            PROJECTILE_POOL.acquire(cx, cy, math.cos(angle), math.sin(angle), 999, 500, WeaponType.PISTOL)
+
+    return run_game(game, ticks, frames, refill)
+
+
+def grenade_mass_kill(ticks, frames, crowd=200, grenades=16):
+    """Leva de granadas em todas as direções no meio de uma multidão, repetida a cada detonação"""
+    game = make_game(character_type=CharacterType.SOLDIER)
+
+    def volley(game):
+        if len(GRENADE_POOL):
+            return
+        if len(game.level.enemies) < crowd:
+            add_enemies(game, crowd - len(game.level.enemies), detection_range=0)
+        cx = game.player.x + TILE_SIZE // 2
+        cy = game.player.y + TILE_SIZE // 2
+        for i in range(grenades):
+            angle = 2 * math.pi * i / grenades
+            GRENADE_POOL.acquire(cx, cy, math.cos(angle), math.sin(angle))
+
+    return run_game(game, ticks, frames, volley)
+
+
+def particle_flood(ticks, frames, per_tick=200):
+    """Sistema de partículas saturado: spawns em toda a tela a cada tick"""
+    rng = random.Random(3)
+    game = make_game()
+
+    def flood(game):
+        for _ in range(per_tick // 20):
+            game.blood_particles.spawn(rng.uniform(100, 900), rng.uniform(100, 650), 20)
+
+    return run_game(game, ticks, frames, flood)
+
+
+def large_map(ticks, frames, blocks=(8, 8)):
+    """Nível de 8x8 telas atravessado na diagonal: pedaços assados e descartados pelo caminho"""
+    seeds = iter(range(2000, 3000))
+    Level.chunk_layers.clear()
+    build_ms = measure(lambda: Level(1, CharacterType.VETERAN, 0, next(seeds), blocks), 2)
+
+    game = make_game(blocks=blocks)
+    level = game.level
+    (start_x, start_y), (end_x, end_y) = level.spawn_point, level.exit_point
+    route = iter(range(ticks + frames))
+
+    def walk(game):
+        # Teletransporte ao longo da diagonal; a câmera acompanha como no jogo
+        progress = next(route) / (ticks + frames)
+        game.player.x = start_x + (end_x - start_x) * progress
+        game.player.y = start_y + (end_y - start_y) * progress
+        game.camera_x = game.player.x - SCREEN_WIDTH // 2
+        game.camera_y = game.player.y - SCREEN_HEIGHT // 2
+
+    result = run_game(game, ticks, 0, walk)
+    result["frame_ms"] = measure(lambda: (walk(game), game.draw()), frames)
+    result["build_ms"] = build_ms
+    result["chunks_loaded"] = len(level.chunks.surfaces)
+    result["chunks_baked"] = level.chunks.baked
+    return result
+
+
+def static_screen(state, dialog_key=None, downed=False):
+    def scenario(ticks, frames):
+        # Telas paradas sobre uma partida em andamento: o custo é quase só apresentar o quadro
+        game = make_game()
+        add_enemies(game, 20)
+        if downed:
+            # Como numa partida real: o jogador cai antes da tela de resultado (e segue rastejando)
+            game.player.state = PlayerState.DOWNED
+        game.state = state
+        if dialog_key:
+            game.dialog_system.start_dialog(dialog_key)
+        return {
+            "tick_ms": measure(game.tick, ticks),
+            "frame_ms": measure(game.draw, frames),
+            "enemies": len(game.level.enemies),
+        }
+    return scenario
+
+
+SCENARIOS = {f"layout-{name}": layout(i) for i, name in enumerate(LAYOUTS)}
+SCENARIOS.update({
+    "enemies-10": enemies(10),
+    "enemies-100": enemies(100),
+    "enemies-1000": enemies(1000),
+    "bullet-storm": bullet_storm,
+    "grenade-mass-kill": grenade_mass_kill,
+    "particle-flood": particle_flood,
+    "large-map": large_map,
+    "screen-menu": static_screen(GameState.MENU),
+    "screen-game-over": static_screen(GameState.GAME_OVER, downed=True),
+    "screen-level-complete": static_screen(GameState.LEVEL_COMPLETE, downed=True),
+    "screen-cutscene": static_screen(GameState.CUTSCENE, "intro"),
+})
@@ -0,0 +1 @@
+"""Simulações headless da campanha em lote, jogadas por um bot (python -m campaign)"""
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import multiprocessing
+from collections import Counter
+
+from campaign.simulation import CHARACTERS, simulate_run
+
+TOTAL_LEVELS = 29
+
+
+def parse_levels(text):
+    # "1-5,12,25-29" -> [1, 2, 3, 4, 5, 12, 25, ...]
+    levels = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        levels.update(range(int(first), int(last or first) + 1))
+    if not levels or min(levels) < 1 or max(levels) > TOTAL_LEVELS:
+        raise argparse.ArgumentTypeError(f"níveis válidos: 1-{TOTAL_LEVELS}")
+    return sorted(levels)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m campaign",
+                                     description="Partidas headless da campanha em lote, jogadas por um bot")
+    parser.add_argument("--levels", type=parse_levels, default=parse_levels(f"1-{TOTAL_LEVELS}"),
+                        help="níveis simulados, ex.: 1-5,12 (padrão: todos)")
+    parser.add_argument("--characters", nargs="*", choices=CHARACTERS, default=list(CHARACTERS),
+                        help="personagens jogados em cada nível (padrão: todos)")
+    parser.add_argument("--seeds", type=int, default=10, help="partidas por nível e personagem")
+    parser.add_argument("--seed-base", type=int, default=0,
+                        help="primeira semente; as partidas usam seed-base .. seed-base+seeds-1")
+    parser.add_argument("--attempts", type=int, default=3, help="tentativas (mortes) por partida")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 3, help="limite de ticks por partida")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos em paralelo (1 = no próprio processo)")
+    parser.add_argument("--output", default="campaign_results.json", help="arquivo JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def make_jobs(args):
+    # Mesmas sementes em todos os níveis e personagens: as comparações usam os mesmos sorteios.
+    # Níveis maiores primeiro, para as partidas longas não ficarem para o fim da fila
+    return [(level_num, character, args.seed_base + index, args.attempts, args.max_ticks)
+            for level_num in sorted(args.levels, reverse=True)
+            for character in args.characters
+            for index in range(args.seeds)]
+
+
+def summarize(runs):
+    cleared = [run for run in runs if run["outcome"] == "clear"]
+    ticks = [run["ticks"] for run in cleared]
+    kills = Counter()
+    for run in runs:
+        kills.update(run["kills"])
+    return {
+        "runs": len(runs),
+        "clear_rate": len(cleared) / len(runs),
+        "outcomes": dict(sorted(Counter(run["outcome"] for run in runs).items())),
+        "ticks_to_clear": {"mean": statistics.fmean(ticks), "median": statistics.median(ticks),
+                           "min": min(ticks), "max": max(ticks)} if ticks else None,
+        "deaths": sum(run["deaths"] for run in runs),
+        "deaths_per_run": statistics.fmean(run["deaths"] for run in runs),
+        "kills": dict(kills.most_common()),
+    }
+
+
+def aggregate(runs):
+    """Resumo por nível e personagem, por nível e geral"""
+    by_group = {}
+    by_level = {}
+    for run in runs:
+        by_group.setdefault((run["level"], run["character"]), []).append(run)
+        by_level.setdefault(run["level"], []).append(run)
+    return {
+        "total": summarize(runs),
+        "levels": [{"level": level_num, **summarize(group)} for level_num, group in sorted(by_level.items())],
+        "groups": [{"level": level_num, "character": character, **summarize(group)}
+                   for (level_num, character), group in sorted(by_group.items())],
+    }
+
+
+def run_all(jobs, workers):
+    # Processos "spawn": cada um importa o jogo do zero (SDL não sobrevive bem a um fork)
+    # e as partidas não compartilham nada além do código
+    if workers <= 1:
+        yield from map(simulate_run, jobs)
+        return
+    pool = multiprocessing.get_context("spawn").Pool(workers)
+    try:
+        yield from pool.imap_unordered(simulate_run, jobs)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = make_jobs(args)
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"{len(jobs)} partidas em {workers} processos...", file=sys.stderr, flush=True)
+
+    runs = []
+    start = time.perf_counter()
+    step = max(1, len(jobs) // 20)
+    for run in run_all(jobs, workers):
+        runs.append(run)
+        if len(runs) % step == 0 or len(runs) == len(jobs):
+            print(f"{len(runs)}/{len(jobs)} ({time.perf_counter() - start:.0f}s)", file=sys.stderr, flush=True)
+    elapsed = time.perf_counter() - start
+
+    # A ordem de chegada depende do escalonamento; o arquivo não
+    runs.sort(key=lambda run: (run["level"], CHARACTERS.index(run["character"]), run["seed"]))
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "workers": workers,
+                 "seconds": elapsed, "runs_per_second": len(runs) / elapsed if elapsed else 0.0,
+                 "seeds": args.seeds, "seed_base": args.seed_base, "attempts": args.attempts,
+                 "max_ticks": args.max_ticks},
+        "summary": aggregate(runs),
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        output_file.write(json.dumps(report, indent=2) + "\n")
+
+    for level in report["summary"]["levels"]:
+        print(f"nível {level['level']:2d}: {level['clear_rate']:.0%} completados, "
+              f"{level['deaths_per_run']:.2f} mortes/partida", file=sys.stderr)
+    print(f"Resultados gravados em {args.output} ({len(runs)} partidas, {elapsed:.1f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
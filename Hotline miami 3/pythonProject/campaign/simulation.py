@@ -0,0 +1,268 @@
+import os
+import math
+from collections import Counter
+
+# O driver headless precisa ser escolhido antes de importar o jogo (também nos processos filhos).
+# Sem os tratadores de sinal do SDL, SIGTERM/Ctrl+C encerram os processos do pool em vez de virar
+# um evento QUIT que ninguém lê
+os.environ.setdefault("HM3_HEADLESS", "1")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from main import (CharacterType, EnemyState, FlowField, Game, GameState, HeldKeys, PlayerState,  # noqa: E402
+                  ScriptedInput, PROJECTILE_POOL, GRENADE_POOL, TILE_SIZE)
+
+CHARACTERS = tuple(CharacterType.__members__)
+BODY = TILE_SIZE - 20
+DIRECT_RANGE = TILE_SIZE * 4  # Com o alvo à vista e perto, anda em linha reta em vez de seguir o campo
+ABILITY_RANGE = 150  # Usa a habilidade da máscara com um inimigo à vista mais perto que isso
+STUCK_TICKS = 2  # Ticks parado segurando teclas até tentar outra direção
+# Desvios (em setores de 45°) tentados em rodízio quando preso: o passo fixo do jogador às vezes
+# não acerta um vão justo, e andar um pouco para os lados muda o alinhamento
+DETOURS = (2, -2, 1, -1, 3, -3, 4)
+STALL_TICKS = 30  # Sem chegar mais perto do alvo por tanto tempo: a linha reta não passa (vão estreito)...
+DETOUR_TICKS = 60  # ... então segue o campo de fluxo por esse tempo antes de tentar a linha reta de novo
+GIVE_UP_TICKS = 600  # Sem progresso nenhum por 10 s, o alvo é tratado como inalcançável
+REGOAL_DISTANCE = TILE_SIZE  # O alvo precisa se afastar isso do destino atual para o campo ser refeito
+
+
+class BotInput(ScriptedInput):
+    """Jogador automático: decide a entrada de cada tick olhando o estado do jogo
+
+    Vai atrás do inimigo vivo ou caído mais próximo pelo campo de fluxo, ataca quando o golpe
+    ou a mira alcançam, executa quem está caído e, com o nível limpo, segue para a saída. Inimigos
+    sem caminho até eles (emparedados) ou que o bot não consegue alcançar são deixados de lado;
+    se só sobrarem eles, `stranded` avisa que o nível não tem como ser completado. Não sorteia
+    nada: a partida inteira sai da semente do Game.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.game = None
+        self.field = None
+        self.field_level = None
+        self.goal = None
+        self.unreachable = set()
+        self.stranded = False
+        self.last_position = None
+        self.moving = False
+        self.stuck = 0
+        self.detour = 0
+        self.wiggle = 0
+        self.target = None
+        self.closest = math.inf
+        self.stalled = 0
+
+    def attach(self, game):
+        self.game = game
+
+    def press(self, key):
+        return self.make_event(["key", key])
+
+    def get_events(self):
+        self.tick += 1
+        self.held = HeldKeys()
+        game = self.game
+        if game.state in (GameState.DIALOG, GameState.CUTSCENE):
+            return [self.press(pygame.K_SPACE)]
+        if game.state == GameState.GAME_OVER:
+            # Tenta de novo; quem limita as tentativas é simulate_run
+            return [self.press(pygame.K_r)]
+        if game.state != GameState.PLAYING or game.player.state != PlayerState.ALIVE:
+            return []
+        return self.play(game.player, game.level)
+
+    def play(self, player, level):
+        position = (player.x, player.y)
+        self.stuck = self.stuck + 1 if self.moving and position == self.last_position else 0
+        self.last_position = position
+        self.moving = False
+        if self.detour:
+            self.detour -= 1
+
+        events = []
+        weapon = player.weapons[player.current_weapon_index]
+        if weapon.is_ranged and weapon.ammo <= 0:
+            events.append(self.press(pygame.K_r))
+        elif not weapon.is_ranged and any(other.is_ranged for other in player.weapons):
+            # Troca até chegar numa arma de fogo; neste tick não ataca com a arma errada
+            events.append(self.press(pygame.K_f))
+            weapon = None
+
+        target = self.nearest(player, level.enemy_batch, self.unreachable)
+        if target is None:
+            # Nível limpo (ou só sobraram inimigos inalcançáveis): rumo à saída
+            self.stranded = any(enemy.state == EnemyState.ALIVE for enemy in self.unreachable)
+            self.move(player, level, *level.exit_point)
+            return events
+
+        distance = math.hypot(target.x - player.x, target.y - player.y)
+        self.track_progress(target, distance)
+        # Raio de visão só quando a resposta muda alguma decisão (habilidade, tiro, linha reta)
+        reach = max(ABILITY_RANGE, DIRECT_RANGE, weapon.range if weapon and weapon.is_ranged else 0)
+        visible = distance < reach and self.visible(level, player, target)
+        target_rect = pygame.Rect(target.x, target.y, BODY, BODY)
+        if target.state == EnemyState.STUNNED:
+            if self.facing_rect(player, 50, 60).colliderect(target_rect):
+                events.append(self.make_event(["mouse", 3]))
+                return events
+        else:
+            if visible and distance < ABILITY_RANGE and player.ability_cooldown <= 0:
+                events.append(self.press(pygame.K_e))
+            if weapon and weapon.can_attack() and self.can_hit(player, weapon, target, target_rect, visible):
+                # Parado para o tiro sair na direção em que já está mirando
+                events.append(self.make_event(["mouse", 1]))
+                return events
+
+        direct = visible and distance < DIRECT_RANGE and not self.detour
+        if not self.move(player, level, target.x, target.y, direct) and distance > DIRECT_RANGE:
+            self.unreachable.add(target)
+        return events
+
+    def track_progress(self, target, distance):
+        if target is not self.target or distance < self.closest - 1:
+            self.target = target
+            self.closest = distance
+            self.stalled = 0
+            return
+        self.stalled += 1
+        if self.stalled % STALL_TICKS == 0:
+            self.detour = DETOUR_TICKS
+        if self.stalled >= GIVE_UP_TICKS:
+            self.unreachable.add(target)
+
+    @staticmethod
+    def nearest(player, batch, skip):
+        # Direto nos arrays do lote: inimigo vivo ou caído mais próximo em linha reta
+        candidates = batch.active[:batch.count] & (batch.state[:batch.count] != EnemyState.DEAD.value)
+        candidates[[enemy._slot for enemy in skip]] = False
+        slots = np.flatnonzero(candidates)
+        if slots.size == 0:
+            return None
+        distance = (batch.x[slots] - player.x) ** 2 + (batch.y[slots] - player.y) ** 2
+        return batch.enemies[slots[np.argmin(distance)]]
+
+    @staticmethod
+    def visible(level, player, target):
+        half = BODY / 2
+        return bool(level.line_of_sight.cast(np.array([player.x + half]), np.array([player.y + half]),
+                                             np.array([target.x + half]), np.array([target.y + half]))[0])
+
+    @staticmethod
+    def facing_rect(player, offset, size):
+        return pygame.Rect(player.x + player.direction[0] * offset, player.y + player.direction[1] * offset,
+                           size, size)
+
+    def can_hit(self, player, weapon, target, target_rect, visible):
+        # Mesmas contas de Player.attack: retângulo à frente (corpo a corpo) ou reta do projétil
+        if not weapon.is_ranged:
+            return self.facing_rect(player, weapon.range, weapon.range).colliderect(target_rect)
+        if not visible:
+            return False
+        aim_x, aim_y = player.direction
+        norm = math.hypot(aim_x, aim_y) or 1.0
+        to_x = target.x + BODY / 2 - (player.x + TILE_SIZE // 2)
+        to_y = target.y + BODY / 2 - (player.y + TILE_SIZE // 2)
+        ahead = (to_x * aim_x + to_y * aim_y) / norm
+        across = abs(to_x * aim_y - to_y * aim_x) / norm
+        return 0 < ahead < weapon.range and across < BODY / 2
+
+    def flow_field(self, level):
+        # Campo próprio cobrindo o nível inteiro, refeito só quando o alvo muda de célula
+        if self.field_level is not level:
+            self.field = FlowField(level.walls, level.width, level.height, window=(level.width, level.height))
+            self.field_level = level
+            self.goal = None
+            self.unreachable = set()
+        return self.field
+
+    def move(self, player, level, goal_x, goal_y, direct=False):
+        """Segura as teclas rumo ao destino; devolve False se o campo diz que não há caminho"""
+        to_x = goal_x - player.x
+        to_y = goal_y - player.y
+        reachable = True
+        if not direct:
+            field = self.flow_field(level)
+            # Alvo andando perto do destino atual não vale um campo novo do nível inteiro
+            if self.goal is None or math.hypot(goal_x - self.goal[0], goal_y - self.goal[1]) >= REGOAL_DISTANCE:
+                self.goal = (goal_x, goal_y)
+            if field.update(*self.goal):
+                next_x, next_y, routed = field.advance(np.array([player.x], dtype=float),
+                                                       np.array([player.y], dtype=float), np.array([player.speed]))
+                if routed[0]:
+                    to_x = next_x[0] - player.x
+                    to_y = next_y[0] - player.y
+                else:
+                    reachable = False
+        turn = 0
+        if self.stuck >= STUCK_TICKS:
+            # Preso numa quina: o rodízio continua de onde parou, sem repetir o mesmo ciclo
+            if self.stuck % STUCK_TICKS == 0:
+                self.wiggle += 1
+            turn = DETOURS[self.wiggle % len(DETOURS)]
+        self.hold(to_x, to_y, turn)
+        return reachable
+
+    def hold(self, to_x, to_y, turn=0):
+        # Oito direções: o setor de 45° mais próximo do vetor desejado (girado `turn` setores)
+        if abs(to_x) < 1e-6 and abs(to_y) < 1e-6:
+            return
+        sector = round(math.atan2(to_y, to_x) / (math.pi / 4)) + turn
+        step_x = round(math.cos(sector * math.pi / 4))
+        step_y = round(math.sin(sector * math.pi / 4))
+        keys = []
+        if step_x:
+            keys.append(pygame.K_d if step_x > 0 else pygame.K_a)
+        if step_y:
+            keys.append(pygame.K_s if step_y > 0 else pygame.K_w)
+        self.held = HeldKeys(keys)
+        self.moving = True
+
+
+def simulate_run(job):
+    """Uma partida headless num nível: o resultado só depende de (nível, personagem, semente)"""
+    level_num, character, seed, attempts, max_ticks = job
+    PROJECTILE_POOL.clear()
+    GRENADE_POOL.clear()
+    bot = BotInput()
+    game = Game(bot, seed)
+    game.prefetcher.enabled = False
+    bot.attach(game)
+    game.start_game(CharacterType[character], level_num)
+    enemy_count = len(game.level.enemies)
+
+    kills = Counter()
+    deaths = 0
+    ticks = 0
+    outcome = "timeout"
+    while ticks < max_ticks:
+        level = game.level
+        enemies = level.enemies
+        playing = game.state == GameState.PLAYING
+        game.tick()
+        ticks += 1
+
+        if game.level is level and level.enemies is not enemies:
+            # Mortos saem da lista do nível no mesmo tick; a causa fica gravada no próprio inimigo
+            remaining = set(level.enemies)
+            kills.update(enemy.killed_by or "UNKNOWN" for enemy in enemies if enemy not in remaining)
+
+        if game.state in (GameState.LEVEL_COMPLETE, GameState.DIALOG):
+            outcome = "clear"
+            break
+        if bot.stranded:
+            # Só sobraram inimigos que o bot não alcança: esperar o limite de ticks não muda nada
+            outcome = "unreachable"
+            break
+        if game.state == GameState.GAME_OVER and playing:
+            deaths += 1
+            if deaths >= attempts:
+                outcome = "death"
+                break
+
+    return {"level": level_num, "character": character, "seed": seed, "outcome": outcome,
+            "ticks": game.level.ticks, "total_ticks": ticks, "deaths": deaths, "enemies": enemy_count,
+            "kills": dict(sorted(kills.items()))}
@@ -1,9 +1,25 @@
-import pygame
+import os
 import sys
+import json
+import time
 import random
 import math
+import zlib
+import struct
+import argparse
+import threading
+from collections import OrderedDict
 from enum import Enum
 
+# Modo headless (sem janela/áudio): o driver precisa ser escolhido antes do pygame.init()
+HEADLESS = "--headless" in sys.argv or os.environ.get("HM3_HEADLESS") == "1"
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+import numpy as np
+
 # Inicialização do Pygame
 pygame.init()
 pygame.mixer.init()
@@ -13,6 +29,22 @@ SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
 TILE_SIZE = 64
 FPS = 60
+TICK_TIME = 1.0 / FPS  # Passo fixo da simulação, em segundos de jogo
+MAX_FRAME_TIME = 0.25  # Quadros mais lentos que isso não viram uma rajada de ticks
+MAX_RENDER_FPS = 144  # Teto da renderização; a simulação não depende dele
+SLOW_MOTION_SCALE = 1 / 3  # Escala de tempo da lentidão do Veterano
+CULL_MARGIN = TILE_SIZE  # Folga da área visível para entidades parcialmente na tela
+SPAWN_SPACING = TILE_SIZE - 20  # Distância mínima entre entidades posicionadas (sem sobreposição)
+SPAWN_PLAYER_CLEARANCE = TILE_SIZE * 2  # Distância mínima entre inimigos e o ponto de entrada do jogador
+NAV_STEP = 8  # Espaçamento da malha de navegação dos inimigos (px)
+NAV_REPLAN = TILE_SIZE // 2  # O campo de fluxo é refeito quando o jogador muda de célula deste tamanho
+LOS_STEP = 8  # Resolução da grade de ocupação usada na linha de visão (px)
+LOS_CELL = 16  # Observadores e alvo agrupados em células deste tamanho no cache de visibilidade
+CHUNK_SIZE = 512  # Lado dos pedaços do nível assados e carregados conforme a câmera anda (px)
+CHUNK_KEEP = 1  # Anel de pedaços mantidos (e simulados a toda velocidade) além da área visível
+MAX_CHUNKS = 32  # Teto de pedaços assados em memória por nível
+FAR_UPDATE_INTERVAL = 4  # Inimigos fora dos pedaços ativos são atualizados a cada N ticks
+ENEMY_CELL = TILE_SIZE * 2  # Lado das células do hash espacial dos inimigos (combate)
 
 # Cores
 RED = (255, 0, 0)
@@ -75,6 +107,503 @@ class PlayerState(Enum):
     DEAD = 2
 
 
+class PygameInput:
+    """Entrada real: eventos e teclado vindos do pygame"""
+
+    def get_events(self):
+        return pygame.event.get()
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+
+class HeldKeys(set):
+    # Imita o retorno de pygame.key.get_pressed() (keys[pygame.K_w])
+    def __getitem__(self, key):
+        return key in self
+
+
+class ScriptedInput:
+    """Entrada roteirizada por tick, usada no modo headless
+
+    Formato do roteiro (JSON):
+        {"events": [[tick, "key", "K_1"], [tick, "mouse", 1], [tick, "quit"]],
+         "hold": [[tick_inicial, tick_final, "K_d"], ...]}
+    """
+
+    def __init__(self, script=None):
+        script = script or {}
+        self.tick = -1
+        self.events = {}
+        for entry in script.get("events", []):
+            self.events.setdefault(entry[0], []).append(self.make_event(entry[1:]))
+        self.holds = [(start, end, self.key_code(name)) for start, end, name in script.get("hold", [])]
+        self.held = HeldKeys()
+
+    @staticmethod
+    def key_code(name):
+        return getattr(pygame, name) if isinstance(name, str) else name
+
+    def make_event(self, entry):
+        kind = entry[0]
+        if kind == "key":
+            return pygame.event.Event(pygame.KEYDOWN, key=self.key_code(entry[1]), mod=0, unicode="", scancode=0)
+        elif kind == "mouse":
+            return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=entry[1], pos=(0, 0))
+        elif kind == "quit":
+            return pygame.event.Event(pygame.QUIT)
+        raise ValueError(f"Evento de roteiro desconhecido: {kind}")
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as script_file:
+            return cls(json.load(script_file))
+
+    def get_events(self):
+        # Cada chamada corresponde a um tick da simulação
+        self.tick += 1
+        self.held = HeldKeys(key for start, end, key in self.holds if start <= self.tick < end)
+        return self.events.get(self.tick, [])
+
+    def get_pressed(self):
+        return self.held
+
+
+# Teclas de movimento gravadas como bitmask por tick (ordem = bit)
+RECORDED_KEYS = (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d,
+                 pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+# Tipos de evento que a simulação consome, com o atributo que importa
+RECORDED_EVENTS = ((pygame.QUIT, None), (pygame.KEYDOWN, "key"), (pygame.MOUSEBUTTONDOWN, "button"))
+
+
+def encode_snapshot(snapshot):
+    # JSON canônico: o mesmo estado sempre gera os mesmos bytes
+    return json.dumps(snapshot, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def rng_state(rng):
+    return list(rng.getstate())
+
+
+def set_rng_state(rng, state):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+def character_name(character_type):
+    # O capítulo final usa a string "FINAL" no lugar de um CharacterType
+    return getattr(character_type, "name", character_type)
+
+
+def character_from_name(name):
+    return CharacterType.__members__.get(name, name)
+
+
+class ReplayFile:
+    """Arquivo binário de replay: semente + entrada por tick + keyframes de estado
+
+    Layout (little-endian):
+        cabeçalho  "HM3R", versão u16, semente u64, intervalo de keyframes u32
+        tick       "T", teclas u8 (bitmask), n u8, n x (tipo u8, código u32)
+        keyframe   "K", tick u32, tamanho u32, snapshot JSON comprimido com zlib
+    """
+
+    MAGIC = b"HM3R"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHQI")
+    TICK = struct.Struct("<cBB")
+    EVENT = struct.Struct("<BI")
+    KEYFRAME = struct.Struct("<cII")
+
+    def __init__(self, seed, keyframe_interval):
+        self.seed = seed
+        self.keyframe_interval = keyframe_interval
+        self.ticks = []  # (bitmask, [(tipo, código), ...]) por tick
+        self.keyframes = {}  # tick -> snapshot codificado (bytes JSON)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+
+        magic, version, seed, interval = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"Arquivo de replay inválido: {path}")
+        replay = cls(seed, interval)
+
+        offset = cls.HEADER.size
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            if tag == b"T":
+                _, mask, count = cls.TICK.unpack_from(data, offset)
+                offset += cls.TICK.size
+                events = []
+                for _ in range(count):
+                    events.append(cls.EVENT.unpack_from(data, offset))
+                    offset += cls.EVENT.size
+                replay.ticks.append((mask, events))
+            elif tag == b"K":
+                _, tick, size = cls.KEYFRAME.unpack_from(data, offset)
+                offset += cls.KEYFRAME.size
+                replay.keyframes[tick] = zlib.decompress(data[offset:offset + size])
+                offset += size
+            else:
+                raise ValueError(f"Registro desconhecido no replay (byte {offset})")
+        return replay
+
+    def snapshot(self, tick):
+        return json.loads(self.keyframes[tick])
+
+    def keyframe_before(self, tick):
+        return max(k for k in self.keyframes if k <= tick)
+
+
+class RecordingInput:
+    """Repassa a entrada de outra fonte e grava cada tick num arquivo de replay"""
+
+    def __init__(self, source, path, keyframe_interval=600):
+        self.source = source
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.file = None
+        self.game = None
+        self.tick = -1
+        self.held = HeldKeys()
+
+    def attach(self, game):
+        # A semente do jogo vai no cabeçalho; o resto é gravado enquanto a partida roda
+        self.game = game
+        self.file = open(self.path, "wb")
+        self.file.write(ReplayFile.HEADER.pack(ReplayFile.MAGIC, ReplayFile.VERSION, game.seed,
+                                               self.keyframe_interval))
+
+    def get_events(self):
+        self.tick += 1
+        if self.tick % self.keyframe_interval == 0:
+            # Estado antes da entrada deste tick: ponto de partida para o seek
+            payload = zlib.compress(encode_snapshot(self.game.snapshot()))
+            self.file.write(ReplayFile.KEYFRAME.pack(b"K", self.tick, len(payload)))
+            self.file.write(payload)
+
+        events = self.source.get_events()
+        pressed = self.source.get_pressed()
+        mask = 0
+        for bit, key in enumerate(RECORDED_KEYS):
+            if pressed[key]:
+                mask |= 1 << bit
+        # O jogo passa a ler exatamente o que foi gravado
+        self.held = HeldKeys(key for key in RECORDED_KEYS if pressed[key])
+
+        recorded = []
+        for event in events:
+            for code, (event_type, attribute) in enumerate(RECORDED_EVENTS):
+                if event.type == event_type:
+                    recorded.append((code, getattr(event, attribute) if attribute else 0))
+
+        self.file.write(ReplayFile.TICK.pack(b"T", mask, len(recorded)))
+        for code, value in recorded:
+            self.file.write(ReplayFile.EVENT.pack(code, value))
+        return events
+
+    def get_pressed(self):
+        return self.held
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class ReplayInput:
+    """Reproduz um arquivo de replay tick a tick, conferindo o estado nos keyframes"""
+
+    def __init__(self, replay, verify=True):
+        self.replay = replay
+        self.verify = verify
+        self.game = None
+        self.tick = -1
+        self.held = HeldKeys()
+        self.checked = 0
+        self.mismatches = []
+
+    @classmethod
+    def from_file(cls, path, verify=True):
+        return cls(ReplayFile.load(path), verify)
+
+    def attach(self, game):
+        self.game = game
+
+    def __len__(self):
+        return len(self.replay.ticks)
+
+    def make_event(self, code, value):
+        event_type, attribute = RECORDED_EVENTS[code]
+        if event_type == pygame.KEYDOWN:
+            return pygame.event.Event(event_type, key=value, mod=0, unicode="", scancode=0)
+        elif event_type == pygame.MOUSEBUTTONDOWN:
+            return pygame.event.Event(event_type, button=value, pos=(0, 0))
+        return pygame.event.Event(event_type)
+
+    def get_events(self):
+        self.tick += 1
+        if self.tick >= len(self.replay.ticks):
+            # Fim da gravação encerra a partida
+            return [pygame.event.Event(pygame.QUIT)]
+
+        if self.verify and self.tick in self.replay.keyframes:
+            self.checked += 1
+            if encode_snapshot(self.game.snapshot()) != self.replay.keyframes[self.tick]:
+                self.mismatches.append(self.tick)
+
+        mask, events = self.replay.ticks[self.tick]
+        self.held = HeldKeys(key for bit, key in enumerate(RECORDED_KEYS) if mask & (1 << bit))
+        return [self.make_event(code, value) for code, value in events]
+
+    def get_pressed(self):
+        return self.held
+
+    def seek(self, tick):
+        # Restaura o keyframe anterior mais próximo e simula só o trecho que falta
+        tick = max(0, min(tick, len(self.replay.ticks)))
+        start = self.replay.keyframe_before(tick)
+        self.game.restore(self.replay.snapshot(start))
+        self.tick = start - 1
+        while self.tick + 1 < tick:
+            self.game.tick()
+        return tick
+
+
+class NullSpan:
+    """Span vazio devolvido com o tracer desligado"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class TraceSpan:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, category=self.category, **self.args)
+        return False
+
+    def set(self, **args):
+        # Argumentos só conhecidos no fim do trecho (ex.: contagens)
+        self.args.update(args)
+
+
+class Tracer:
+    """Spans no formato trace-event do Chrome/Perfetto (chrome://tracing, ui.perfetto.dev)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.threads = {}
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.events = []
+        self.threads = {}
+        self.origin = time.perf_counter()
+
+    def span(self, name, category="game", **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return TraceSpan(self, name, category, args)
+
+    def complete(self, name, start, end=None, category="game", **args):
+        end = time.perf_counter() if end is None else end
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        # append é atômico: a thread de pré-carregamento grava na mesma lista
+        self.events.append({"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": tid,
+                            "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "args": args})
+
+    def save(self, path):
+        names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                 for tid, name in self.threads.items()]
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": names + self.events, "displayTimeUnit": "ms"}, trace_file)
+        return len(self.events)
+
+
+TRACER = Tracer()
+
+
+class TextureRegistry:
+    """Texturas procedurais construídas uma vez por (tipo, variante) e compartilhadas"""
+
+    def __init__(self):
+        self.textures = {}
+        self.builds = 0
+        self.lock = threading.Lock()
+
+    def get(self, kind, variant, builder):
+        key = (kind, variant)
+        # Níveis também são construídos na thread de pré-carregamento
+        with self.lock:
+            texture = self.textures.get(key)
+            if texture is None:
+                texture = builder(variant)
+                self.textures[key] = texture
+                self.builds += 1
+        return texture
+
+
+# Registro global: jogador, inimigos e paredes apontam para as mesmas superfícies
+TEXTURES = TextureRegistry()
+
+
+class SpriteCache:
+    """Cache LRU de sprites com alpha pré-renderizados, chave (forma, cor, tamanho, alpha)"""
+
+    def __init__(self, max_entries=256, alpha_step=16):
+        self.max_entries = max_entries
+        self.alpha_step = alpha_step
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize_alpha(self, alpha):
+        step = self.alpha_step
+        return max(0, min(255, (int(alpha) + step // 2) // step * step))
+
+    def circle(self, color, size, alpha, radius=None):
+        # Superfície (size*2 x size*2) com um círculo centralizado
+        radius = size if radius is None else radius
+        key = ("circle", color, size, radius, self.quantize_alpha(alpha))
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*color, key[4]), (size, size), radius)
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+
+    def stats(self):
+        return {"entries": len(self.sprites), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+# Cache compartilhado pelas partículas e rastros de projéteis
+SPRITE_CACHE = SpriteCache()
+
+
+def segment_rect_entry(x0, y0, x1, y1, left, top, right, bottom):
+    # Teste de slabs: parâmetro t (0..1) em que o segmento entra no retângulo, ou None
+    t_min, t_max = 0.0, 1.0
+    for start, delta, low, high in ((x0, x1 - x0, left, right), (y0, y1 - y0, top, bottom)):
+        if delta == 0:
+            if not low < start < high:
+                return None
+            continue
+        t0 = (low - start) / delta
+        t1 = (high - start) / delta
+        if t0 > t1:
+            t0, t1 = t1, t0
+        t_min = max(t_min, t0)
+        t_max = min(t_max, t1)
+        if t_min >= t_max:
+            return None
+    return t_min
+
+
+class ParticleSystem:
+    """Partículas em arrays NumPy pré-alocados (x, y, vx, vy, vida) com capacidade fixa"""
+
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.arrays = (self.x, self.y, self.vx, self.vy, self.life)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def snapshot(self):
+        return [array[:self.count].tolist() for array in self.arrays]
+
+    def restore(self, data):
+        self.count = len(data[0])
+        for array, values in zip(self.arrays, data):
+            array[:self.count] = values
+
+    def spawn(self, x, y, amount, speed=8, min_life=30, max_life=60):
+        # Acima da capacidade as partículas excedentes são descartadas
+        amount = min(amount, self.capacity - self.count)
+        if amount <= 0:
+            return 0
+
+        # Semente tirada do random global para manter a simulação reproduzível
+        rng = np.random.default_rng(random.getrandbits(32))
+        start, end = self.count, self.count + amount
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = rng.uniform(-speed, speed, amount)
+        self.vy[start:end] = rng.uniform(-speed, speed, amount)
+        self.life[start:end] = rng.integers(min_life, max_life + 1, amount)
+        self.count = end
+        return amount
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+
+        # Integração e envelhecimento de todas as partículas de uma vez
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
+
+        dead = np.flatnonzero(self.life[:n] <= 0)
+        if dead.size == 0:
+            return
+
+        # Swap-remove: partículas vivas do fim ocupam os buracos da parte que fica
+        alive_count = n - dead.size
+        holes = dead[dead < alive_count]
+        if holes.size:
+            tail = alive_count + np.flatnonzero(self.life[alive_count:n] > 0)
+            for array in self.arrays:
+                array[holes] = array[tail]
+        self.count = alive_count
+
+
 class DialogSystem:
     def __init__(self):
         self.dialogs = {
@@ -126,9 +655,14 @@ class DialogSystem:
         self.dialog_index = 0
         self.dialog_timer = 0
         self.is_cutscene = False
+        self.trace_start = None  # Início do diálogo atual, para o span do tracer
+        self.fonts = {}
+        self.renders = {}  # (texto, tamanho, cor) -> superfície; as falas são poucas e fixas
 
     def start_dialog(self, dialog_key):
         if dialog_key in self.dialogs:
+            if TRACER.enabled:
+                self.trace_start = (time.perf_counter(), dialog_key)
             self.current_dialog = self.dialogs[dialog_key]
             self.dialog_index = 0
             self.dialog_timer = 180  # 3 segundos
@@ -136,6 +670,16 @@ class DialogSystem:
             return True
         return False
 
+    def snapshot(self):
+        return {"lines": list(self.current_dialog), "index": self.dialog_index,
+                "timer": self.dialog_timer, "cutscene": self.is_cutscene}
+
+    def restore(self, data):
+        self.current_dialog = data["lines"]
+        self.dialog_index = data["index"]
+        self.dialog_timer = data["timer"]
+        self.is_cutscene = data["cutscene"]
+
     def update(self):
         if self.current_dialog and self.dialog_timer > 0:
             self.dialog_timer -= 1
@@ -147,39 +691,55 @@ class DialogSystem:
         if self.dialog_index < len(self.current_dialog):
             self.dialog_timer = 180
         else:
+            if self.trace_start:
+                start, dialog_key = self.trace_start
+                TRACER.complete("dialog", start, category="dialog", key=str(dialog_key),
+                                lines=len(self.current_dialog), cutscene=self.is_cutscene)
+                self.trace_start = None
             self.current_dialog = []
             self.dialog_index = 0
 
+    def visible_line(self):
+        # O que está na tela: muda só quando a fala avança (o timer não altera o desenho)
+        if self.current_dialog and self.dialog_timer > 0:
+            return self.current_dialog[self.dialog_index], self.is_cutscene
+        return None
+
+    def render(self, text, size, color):
+        key = (text, size, color)
+        surface = self.renders.get(key)
+        if surface is None:
+            font = self.fonts.get(size)
+            if font is None:
+                font = self.fonts[size] = pygame.font.SysFont('Arial', size)
+            surface = self.renders[key] = font.render(text, True, color)
+        return surface
+
     def draw(self, screen):
         if self.current_dialog and self.dialog_timer > 0:
             if self.is_cutscene:
                 # Fundo para cutscene
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                overlay.fill((0, 0, 0))
-                screen.blit(overlay, (0, 0))
+                screen.fill((0, 0, 0))
 
                 text = self.current_dialog[self.dialog_index]
-                font = pygame.font.SysFont('Arial', 36)
-                text_surface = font.render(text, True, WHITE)
+                text_surface = self.render(text, 36, WHITE)
                 screen.blit(text_surface, (SCREEN_WIDTH // 2 - text_surface.get_width() // 2,
                                            SCREEN_HEIGHT // 2 - 50))
 
                 # Instrução para pular
-                skip_font = pygame.font.SysFont('Arial', 18)
-                skip_text = skip_font.render("Pressione ESPAÇO para continuar", True, YELLOW)
+                skip_text = self.render("Pressione ESPAÇO para continuar", 18, YELLOW)
                 screen.blit(skip_text, (SCREEN_WIDTH // 2 - skip_text.get_width() // 2,
                                         SCREEN_HEIGHT // 2 + 50))
             else:
                 # Dialogo normal durante o jogo
                 text = self.current_dialog[self.dialog_index]
-                font = pygame.font.SysFont('Arial', 24)
 
                 # Fundo do diálogo
                 dialog_rect = pygame.Rect(50, SCREEN_HEIGHT - 150, SCREEN_WIDTH - 100, 100)
                 pygame.draw.rect(screen, (30, 30, 30), dialog_rect)
                 pygame.draw.rect(screen, WHITE, dialog_rect, 2)
 
-                text_surface = font.render(text, True, WHITE)
+                text_surface = self.render(text, 24, WHITE)
                 screen.blit(text_surface, (70, SCREEN_HEIGHT - 130))
 
 
@@ -279,6 +839,20 @@ class Weapon:
             return True
         return False
 
+    STATE_FIELDS = ("damage", "range", "cooldown", "ammo", "max_ammo", "is_ranged", "is_melee")
+
+    def snapshot(self):
+        data = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        data["weapon_type"] = self.weapon_type.name
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data):
+        weapon = cls(WeaponType[data["weapon_type"]])
+        for name in cls.STATE_FIELDS:
+            setattr(weapon, name, data[name])
+        return weapon
+
 
 class Player:
     def __init__(self, character_type):
@@ -318,11 +892,42 @@ class Player:
         self.texture = self.load_texture()
         self.downed_texture = self.load_downed_texture()
 
+    STATE_FIELDS = ("speed", "max_health", "mask_ability", "x", "y", "health", "attack_cooldown", "score",
+                    "combo", "combo_timer", "legacy_points", "current_weapon_index", "downed_timer",
+                    "ability_cooldown", "ability_duration")
+
+    def snapshot(self, enemies):
+        data = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        data["character_type"] = self.character_type.name
+        data["state"] = self.state.name
+        data["direction"] = list(self.direction)
+        data["weapons"] = [weapon.snapshot() for weapon in self.weapons]
+        # O inimigo marcado é guardado pela posição na lista do nível
+        marked = [i for i, enemy in enumerate(enemies) if enemy is self.marked_enemy]
+        data["marked_enemy"] = marked[0] if marked else None
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data, enemies):
+        player = cls(CharacterType[data["character_type"]])
+        for name in cls.STATE_FIELDS:
+            setattr(player, name, data[name])
+        player.state = PlayerState[data["state"]]
+        player.direction = tuple(data["direction"])
+        player.weapons = [Weapon.from_snapshot(weapon) for weapon in data["weapons"]]
+        if data["marked_enemy"] is not None:
+            player.marked_enemy = enemies[data["marked_enemy"]]
+        return player
+
     def load_texture(self):
+        return TEXTURES.get("player", self.character_type, Player.build_texture)
+
+    @staticmethod
+    def build_texture(character_type):
         # Criar texturas detalhadas baseadas no tipo
         texture = pygame.Surface((TILE_SIZE - 20, TILE_SIZE - 20), pygame.SRCALPHA)
 
-        if self.character_type == CharacterType.VETERAN:
+        if character_type == CharacterType.VETERAN:
             # Veterano - azul com detalhes
             texture.fill(BLUE)
             pygame.draw.rect(texture, (100, 100, 255), (5, 5, TILE_SIZE - 30, TILE_SIZE - 30))
@@ -330,7 +935,7 @@ class Player:
             # Detalhes da máscara
             pygame.draw.line(texture, BLACK, (15, 20), (TILE_SIZE - 25, 20), 2)
 
-        elif self.character_type == CharacterType.INVESTIGATOR:
+        elif character_type == CharacterType.INVESTIGATOR:
             # Investigadora - verde com detalhes
             texture.fill(GREEN)
             pygame.draw.rect(texture, (100, 200, 100), (8, 8, TILE_SIZE - 36, TILE_SIZE - 36))
@@ -339,7 +944,7 @@ class Player:
             pygame.draw.circle(texture, BLACK, (20, 20), 3)
             pygame.draw.circle(texture, BLACK, (TILE_SIZE - 25, 20), 3)
 
-        elif self.character_type == CharacterType.SUCCESSOR:
+        elif character_type == CharacterType.SUCCESSOR:
             # Sucessor - vermelho com detalhes
             texture.fill(RED)
             pygame.draw.polygon(texture, (255, 100, 100), [
@@ -349,7 +954,7 @@ class Player:
             for i in range(3):
                 pygame.draw.line(texture, BLACK, (10 + i * 10, 15), (TILE_SIZE - 30, 15 + i * 5), 1)
 
-        elif self.character_type == CharacterType.EXECUTIONER:
+        elif character_type == CharacterType.EXECUTIONER:
             # Executioner - roxo com detalhes
             texture.fill(PURPLE)
             pygame.draw.rect(texture, (150, 50, 150), (5, 5, TILE_SIZE - 30, TILE_SIZE - 30), 3)
@@ -357,16 +962,17 @@ class Player:
             pygame.draw.line(texture, WHITE, (10, 10), (TILE_SIZE - 30, TILE_SIZE - 30), 3)
             pygame.draw.line(texture, WHITE, (TILE_SIZE - 30, 10), (10, TILE_SIZE - 30), 3)
 
-        elif self.character_type == CharacterType.SOLDIER:
+        elif character_type == CharacterType.SOLDIER:
             # Soldier - camuflagem
             texture.fill((100, 80, 60))  # Marrom base
-            # Padrão de camuflagem
+            # Padrão de camuflagem (gerador próprio: a textura é compartilhada)
+            rng = random.Random(character_type.value)
             colors = [(80, 100, 60), (120, 100, 80), (60, 80, 100)]
             for i in range(8):
-                color = random.choice(colors)
-                x = random.randint(5, TILE_SIZE - 25)
-                y = random.randint(5, TILE_SIZE - 25)
-                size = random.randint(8, 15)
+                color = rng.choice(colors)
+                x = rng.randint(5, TILE_SIZE - 25)
+                y = rng.randint(5, TILE_SIZE - 25)
+                size = rng.randint(8, 15)
                 pygame.draw.ellipse(texture, color, (x, y, size, size))
             # Capacete
             pygame.draw.ellipse(texture, DARK_GRAY, (10, 5, TILE_SIZE - 30, 15))
@@ -374,6 +980,10 @@ class Player:
         return texture
 
     def load_downed_texture(self):
+        return TEXTURES.get("player_downed", None, Player.build_downed_texture)
+
+    @staticmethod
+    def build_downed_texture(variant):
         # Textura quando o jogador está caído
         texture = pygame.Surface((TILE_SIZE - 20, TILE_SIZE - 20), pygame.SRCALPHA)
         texture.fill((100, 100, 100, 180))  # Cinza semi-transparente
@@ -383,6 +993,8 @@ class Player:
     def reset(self):
         self.x = 100
         self.y = 100
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.health = self.max_health
         self.direction = (1, 0)
         self.attack_cooldown = 0
@@ -395,29 +1007,23 @@ class Player:
         self.state = PlayerState.ALIVE
         self.downed_timer = 0
 
-    def move(self, dx, dy, walls):
+    def move(self, dx, dy, wall_grid):
         if self.state != PlayerState.ALIVE:
             return
 
         new_x = self.x + dx * self.speed
         new_y = self.y + dy * self.speed
 
-        # Verificar colisão com paredes
+        # Verificar colisão com paredes (apenas as células da grade tocadas)
         future_rect = pygame.Rect(new_x, new_y, TILE_SIZE - 20, TILE_SIZE - 20)
-        collision = False
 
-        for wall in walls:
-            if future_rect.colliderect(wall):
-                collision = True
-                break
-
-        if not collision:
+        if not wall_grid.collides(future_rect):
             self.x = new_x
             self.y = new_y
             if dx != 0 or dy != 0:
                 self.direction = (dx, dy)
 
-    def attack(self, enemies):
+    def attack(self, enemy_grid):
         if self.state != PlayerState.ALIVE:
             return None
 
@@ -435,19 +1041,18 @@ class Player:
                     weapon.range, weapon.range
                 )
 
-                for enemy in enemies:
-                    enemy_rect = pygame.Rect(enemy.x, enemy.y, TILE_SIZE - 20, TILE_SIZE - 20)
-                    if attack_rect.colliderect(enemy_rect) and enemy.state == EnemyState.ALIVE:
-                        enemy.state = EnemyState.STUNNED
-                        enemy.stun_timer = 180  # 3 segundos caído
-                        self.combo += 1
-                        self.combo_timer = 60
-                        self.score += 10 * self.combo
-                        self.legacy_points += 1
-                        return True
+                # Só o primeiro da lista atingido pelo golpe cai
+                for enemy in enemy_grid.colliding(attack_rect, EnemyState.ALIVE):
+                    enemy.state = EnemyState.STUNNED
+                    enemy.stun_timer = 180  # 3 segundos caído
+                    self.combo += 1
+                    self.combo_timer = 60
+                    self.score += 10 * self.combo
+                    self.legacy_points += 1
+                    return True
         return None
 
-    def execute_enemy(self, enemies):
+    def execute_enemy(self, enemy_grid):
         """Executar inimigo caído (como no HM2)"""
         if self.state != PlayerState.ALIVE:
             return False
@@ -459,31 +1064,29 @@ class Player:
             60, 60
         )
 
-        for enemy in enemies:
-            if enemy.state == EnemyState.STUNNED:
-                enemy_rect = pygame.Rect(enemy.x, enemy.y, TILE_SIZE - 20, TILE_SIZE - 20)
-                if execute_rect.colliderect(enemy_rect):
-                    # Execução baseada na arma
-                    if weapon.is_melee:
-                        enemy.health = 0
-                        enemy.state = EnemyState.DEAD
-                        self.score += 50
-                        return True
-                    elif weapon.is_ranged:
-                        # Headshot - instant kill
-                        enemy.health = 0
-                        enemy.state = EnemyState.DEAD
-                        self.score += 75
-                        return True
+        for enemy in enemy_grid.colliding(execute_rect, EnemyState.STUNNED):
+            # Execução baseada na arma
+            enemy.killed_by = weapon.weapon_type.name
+            if weapon.is_melee:
+                enemy.health = 0
+                enemy.state = EnemyState.DEAD
+                self.score += 50
+                return True
+            elif weapon.is_ranged:
+                # Headshot - instant kill
+                enemy.health = 0
+                enemy.state = EnemyState.DEAD
+                self.score += 75
+                return True
         return False
 
     def create_projectile(self):
         weapon = self.weapons[self.current_weapon_index]
-        return Projectile(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
-                          self.direction[0], self.direction[1],
-                          weapon.damage, weapon.range, weapon.weapon_type)
+        return PROJECTILE_POOL.acquire(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
+                                       self.direction[0], self.direction[1],
+                                       weapon.damage, weapon.range, weapon.weapon_type)
 
-    def use_ability(self, enemies):
+    def use_ability(self, enemies, enemy_grid):
         if self.state != PlayerState.ALIVE or self.ability_cooldown > 0:
             return None
 
@@ -506,19 +1109,11 @@ class Player:
 
         elif self.mask_ability == "execute" and enemies:
             # Executar inimigo mais próximo
-            closest_enemy = None
-            min_dist = float('inf')
-
-            for enemy in enemies:
-                if enemy.state == EnemyState.ALIVE:
-                    dist = math.sqrt((enemy.x - self.x) ** 2 + (enemy.y - self.y) ** 2)
-                    if dist < 100 and dist < min_dist:
-                        closest_enemy = enemy
-                        min_dist = dist
-
+            closest_enemy = enemy_grid.nearest(self.x, self.y, 100, EnemyState.ALIVE)
             if closest_enemy:
                 closest_enemy.health = 0
                 closest_enemy.state = EnemyState.DEAD
+                closest_enemy.killed_by = "EXECUTE"
                 self.ability_cooldown = 300
                 return "INIMIGO EXECUTADO"
 
@@ -530,8 +1125,8 @@ class Player:
         return None
 
     def create_grenade(self):
-        return Grenade(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
-                       self.direction[0], self.direction[1])
+        return GRENADE_POOL.acquire(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
+                                    self.direction[0], self.direction[1])
 
     def take_damage(self, damage):
         if self.state != PlayerState.ALIVE:
@@ -601,14 +1196,17 @@ class Player:
         self.weapons.append(new_weapon)
         return True
 
-    def draw(self, screen, camera_x, camera_y):
+    def crawl_position(self, camera_x, camera_y):
+        # Animação de rastejar: segue o relógio, não os ticks (continua nas telas paradas)
+        crawl_offset = math.sin(pygame.time.get_ticks() * 0.01) * 5
+        return (int(self.x - camera_x + TILE_SIZE // 2),
+                int(self.y - camera_y + TILE_SIZE // 2 + crawl_offset))
+
+    def draw(self, screen, camera_x, camera_y, crawl=True):
         if self.state == PlayerState.DOWNED:
             screen.blit(self.downed_texture, (self.x - camera_x, self.y - camera_y))
-            # Animação de rastejar
-            crawl_offset = math.sin(pygame.time.get_ticks() * 0.01) * 5
-            pygame.draw.circle(screen, RED,
-                               (int(self.x - camera_x + TILE_SIZE // 2),
-                                int(self.y - camera_y + TILE_SIZE // 2 + crawl_offset)), 3)
+            if crawl:
+                pygame.draw.circle(screen, RED, self.crawl_position(camera_x, camera_y), 3)
         else:
             screen.blit(self.texture, (self.x - camera_x, self.y - camera_y))
 
@@ -619,16 +1217,32 @@ class Player:
 
 
 class Grenade:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "dx", "dy", "timer", "exploded", "radius", "pool_index")
+
     def __init__(self, x, y, dx, dy):
-        self.x = x
-        self.y = y
+        self.pool_index = -1
+        self.reset(x, y, dx, dy)
+
+    def reset(self, x, y, dx, dy):
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
         self.dx = dx * 5
         self.dy = dy * 5
         self.timer = 90  # 1.5 segundos
         self.exploded = False
         self.radius = 150
 
-    def update(self, walls, enemies):
+    STATE_FIELDS = ("x", "y", "dx", "dy", "timer", "exploded", "radius")
+
+    def snapshot(self):
+        return {name: getattr(self, name) for name in self.STATE_FIELDS}
+
+    def restore(self, data):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, data[name])
+        self.prev_x, self.prev_y = self.x, self.y
+
+    def update(self, wall_grid, enemy_grid):
         if self.exploded:
             return True
 
@@ -638,25 +1252,29 @@ class Grenade:
 
         # Verificar colisão com paredes
         grenade_rect = pygame.Rect(self.x - 8, self.y - 8, 16, 16)
-        for wall in walls:
-            if grenade_rect.colliderect(wall):
-                self.explode(enemies)
-                return True
+        if wall_grid.collides(grenade_rect):
+            self.explode(enemy_grid)
+            return True
 
         if self.timer <= 0:
-            self.explode(enemies)
+            self.explode(enemy_grid)
             return True
 
         return False
 
-    def explode(self, enemies):
-        self.exploded = True
-        # Matar todos os inimigos no raio
-        for enemy in enemies:
-            dist = math.sqrt((enemy.x - self.x) ** 2 + (enemy.y - self.y) ** 2)
-            if dist < self.radius:
+    def explode(self, enemy_grid):
+        with TRACER.span("grenade_explode", "combat") as span:
+            self.exploded = True
+            killed = 0
+            # Matar todos os inimigos no raio
+            caught = enemy_grid.within(self.x, self.y, self.radius)
+            for enemy in caught:
+                if enemy.state != EnemyState.DEAD:
+                    killed += 1
+                    enemy.killed_by = "GRENADE"
                 enemy.health = 0
                 enemy.state = EnemyState.DEAD
+            span.set(enemies=len(caught), killed=killed)
 
     def draw(self, screen, camera_x, camera_y):
         if not self.exploded:
@@ -667,9 +1285,16 @@ class Grenade:
 
 
 class Projectile:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "dx", "dy", "damage", "range", "distance_traveled", "weapon_type",
+                 "active", "pool_index")
+
     def __init__(self, x, y, dx, dy, damage, range, weapon_type):
-        self.x = x
-        self.y = y
+        self.pool_index = -1
+        self.reset(x, y, dx, dy, damage, range, weapon_type)
+
+    def reset(self, x, y, dx, dy, damage, range, weapon_type):
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
         self.dx = dx * 15  # Velocidade aumentada
         self.dy = dy * 15
         self.damage = damage
@@ -678,29 +1303,40 @@ class Projectile:
         self.weapon_type = weapon_type
         self.active = True
 
-    def update(self, walls, enemies):
+    STATE_FIELDS = ("x", "y", "dx", "dy", "damage", "range", "distance_traveled", "active")
+
+    def snapshot(self):
+        data = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        data["weapon_type"] = self.weapon_type.name
+        return data
+
+    def restore(self, data):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, data[name])
+        self.weapon_type = WeaponType[data["weapon_type"]]
+        self.prev_x, self.prev_y = self.x, self.y
+
+    RADIUS = 3  # Metade do retângulo de colisão 6x6 do projétil
+
+    def update(self, wall_grid, enemy_grid):
         if not self.active:
             return None
 
+        start_x, start_y = self.x, self.y
         self.x += self.dx
         self.y += self.dy
         self.distance_traveled += math.sqrt(self.dx ** 2 + self.dy ** 2)
 
-        # Verificar colisão com paredes
-        proj_rect = pygame.Rect(self.x - 3, self.y - 3, 6, 6)
-        for wall in walls:
-            if proj_rect.colliderect(wall):
-                self.active = False
+        # Colisão contínua: primeiro impacto (parede ou inimigo) ao longo do trajeto do tick
+        t, hit = self.sweep(wall_grid, enemy_grid, start_x, start_y, self.x, self.y)
+        if hit is not None:
+            self.x = start_x + (self.x - start_x) * t
+            self.y = start_y + (self.y - start_y) * t
+            self.active = False
+            if hit == "wall":
                 return "wall"
-
-        # Verificar colisão com inimigos
-        for enemy in enemies:
-            if enemy.state == EnemyState.ALIVE:
-                enemy_rect = pygame.Rect(enemy.x, enemy.y, TILE_SIZE - 20, TILE_SIZE - 20)
-                if proj_rect.colliderect(enemy_rect):
-                    enemy.take_damage(self.damage)
-                    self.active = False
-                    return enemy
+            hit.take_damage(self.damage, self.weapon_type.name)
+            return hit
 
         # Verificar alcance máximo
         if self.distance_traveled >= self.range:
@@ -708,6 +1344,38 @@ class Projectile:
 
         return None
 
+    def sweep(self, wall_grid, enemy_grid, x0, y0, x1, y1):
+        # Percorre só as células da grade cruzadas pelo segmento (DDA) e devolve
+        # (t, alvo) do impacto mais cedo; em empate a parede vence, como antes
+        radius = self.RADIUS
+        best_t = None
+        best_hit = None
+        checked = set()
+        for cx, cy, t_enter in wall_grid.cells_on_segment(x0, y0, x1, y1):
+            if best_t is not None and t_enter > best_t:
+                break
+            for index in wall_grid.cells.get((cx, cy), ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                wall = wall_grid.walls[index]
+                t = segment_rect_entry(x0, y0, x1, y1, wall.left - radius, wall.top - radius,
+                                       wall.right + radius, wall.bottom + radius)
+                if t is not None and (best_t is None or t < best_t):
+                    best_t, best_hit = t, "wall"
+
+        # Inimigos: só os do hash que tocam a caixa do segmento passam pelo teste exato
+        size = TILE_SIZE - 20
+        min_x, max_x = min(x0, x1) - radius, max(x0, x1) + radius
+        min_y, max_y = min(y0, y1) - radius, max(y0, y1) + radius
+        for enemy in enemy_grid.query(min_x, min_y, max_x, max_y, EnemyState.ALIVE):
+            ex, ey = enemy.x, enemy.y
+            t = segment_rect_entry(x0, y0, x1, y1, ex - radius, ey - radius, ex + size + radius, ey + size + radius)
+            if t is not None and (best_t is None or t < best_t):
+                best_t, best_hit = t, enemy
+
+        return best_t, best_hit
+
     def draw(self, screen, camera_x, camera_y):
         if self.active:
             if self.weapon_type in [WeaponType.PISTOL, WeaponType.SNIPER, WeaponType.RIFLE]:
@@ -722,30 +1390,133 @@ class Projectile:
 
             pygame.draw.circle(screen, color,
                                (int(self.x - camera_x), int(self.y - camera_y)), size)
-            # Efeito de rastro
+            # Efeito de rastro (sprites reaproveitados do cache)
             for i in range(3):
                 trail_x = self.x - self.dx * (i + 1) * 0.3 - camera_x
                 trail_y = self.y - self.dy * (i + 1) * 0.3 - camera_y
                 alpha = 150 - i * 50
-                trail_surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-                pygame.draw.circle(trail_surface, (*color, alpha), (size, size), size - i)
+                trail_surface = SPRITE_CACHE.circle(color, size, alpha, size - i)
                 screen.blit(trail_surface, (trail_x - size, trail_y - size))
 
 
+def batch_field(name, cast, moves=False):
+    # Atributo do inimigo guardado nos arrays do EnemyBatch (o Enemy é só uma visão);
+    # mudar a posição (moves) invalida o hash espacial do lote
+    def getter(self):
+        return cast(getattr(self._batch, name)[self._slot])
+
+    def setter(self, value):
+        getattr(self._batch, name)[self._slot] = value
+        if moves:
+            self._batch.grid.dirty = True
+
+    return property(getter, setter)
+
+
+ENEMY_STATES = tuple(EnemyState)
+
+
+class ObjectPool:
+    """Pool de objetos reciclados: ativos num array denso com remoção O(1) por troca"""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.active = []
+        self.free = []
+        self.created = 0
+        self.acquired = 0
+        self.reused = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __getitem__(self, index):
+        return self.active[index]
+
+    def acquire(self, *args):
+        self.acquired += 1
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+        else:
+            obj = self.cls(*args)
+            self.created += 1
+        obj.pool_index = len(self.active)
+        self.active.append(obj)
+        self.high_water = max(self.high_water, len(self.active))
+        return obj
+
+    def release(self, obj):
+        # Swap-remove: o último ativo ocupa o lugar do liberado
+        index = obj.pool_index
+        last = self.active.pop()
+        if last is not obj:
+            self.active[index] = last
+            last.pool_index = index
+        obj.pool_index = -1
+        self.free.append(obj)
+
+    def clear(self):
+        while self.active:
+            self.release(self.active[-1])
+
+    def stats(self):
+        return {"created": self.created, "active": len(self.active), "high_water": self.high_water,
+                "reuse_ratio": self.reused / self.acquired if self.acquired else 0.0}
+
+
+# Projéteis e granadas ativos de todo o jogo
+PROJECTILE_POOL = ObjectPool(Projectile)
+GRENADE_POOL = ObjectPool(Grenade)
+
+
 class Enemy:
-    def __init__(self, x, y, enemy_type="guard"):
-        self.x = x
-        self.y = y
+    __slots__ = ("_batch", "_slot", "enemy_type", "has_weapon", "weapon", "texture", "stun_texture", "killed_by")
+
+    x = batch_field("x", float, moves=True)
+    y = batch_field("y", float, moves=True)
+    prev_x = batch_field("prev_x", float)
+    prev_y = batch_field("prev_y", float)
+    speed = batch_field("speed", float)
+    health = batch_field("health", int)
+    attack_cooldown = batch_field("attack_cooldown", int)
+    stun_timer = batch_field("stun_timer", int)
+    detection_range = batch_field("detection_range", float)
+    attack_range = batch_field("attack_range", float)
+    alerted = batch_field("alerted", bool)
+
+    @property
+    def state(self):
+        return ENEMY_STATES[self._batch.state[self._slot]]
+
+    @state.setter
+    def state(self, value):
+        self._batch.state[self._slot] = value.value
+
+    def __init__(self, x, y, enemy_type="guard", batch=None, rng=random):
+        # Inimigos avulsos (fora de um nível) ganham um lote próprio
+        self._batch = batch if batch is not None else EnemyBatch(1)
+        self._slot = self._batch.add(self)
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
         self.enemy_type = enemy_type
         self.health = 1  # Hit kill para inimigos também
         self.speed = 2
         self.attack_cooldown = 0
         self.detection_range = 150
         self.attack_range = 50
-        self.has_weapon = random.choice([True, False])
+        self.has_weapon = rng.choice([True, False])
         self.weapon = None
         self.state = EnemyState.ALIVE
         self.stun_timer = 0
+        self.alerted = False  # Já viu o jogador: continua perseguindo mesmo sem linha de visão
+        self.killed_by = None  # Arma (ou habilidade) do golpe fatal; sobrevive à saída do lote
+        self._batch.sniper[self._slot] = enemy_type == "sniper"
         self.texture = self.load_texture()
         self.stun_texture = self.load_stun_texture()
 
@@ -760,33 +1531,61 @@ class Enemy:
             self.has_weapon = True
 
         if self.has_weapon:
-            self.weapon = Weapon(random.choice([WeaponType.PISTOL, WeaponType.KNIFE, WeaponType.BAT]))
+            self.weapon = Weapon(rng.choice([WeaponType.PISTOL, WeaponType.KNIFE, WeaponType.BAT]))
+
+    STATE_FIELDS = ("x", "y", "speed", "health", "attack_cooldown", "stun_timer", "detection_range",
+                    "attack_range", "alerted")
+
+    def snapshot(self):
+        data = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        data["enemy_type"] = self.enemy_type
+        data["state"] = self.state.name
+        data["has_weapon"] = self.has_weapon
+        data["weapon"] = self.weapon.snapshot() if self.weapon else None
+        data["killed_by"] = self.killed_by
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data, batch):
+        # Gerador descartável: tudo o que ele sortearia é sobrescrito logo abaixo
+        enemy = cls(data["x"], data["y"], data["enemy_type"], batch, random.Random(0))
+        for name in cls.STATE_FIELDS:
+            setattr(enemy, name, data[name])
+        enemy.state = EnemyState[data["state"]]
+        enemy.has_weapon = data["has_weapon"]
+        enemy.weapon = Weapon.from_snapshot(data["weapon"]) if data["weapon"] else None
+        enemy.killed_by = data["killed_by"]
+        return enemy
 
     def load_texture(self):
+        return TEXTURES.get("enemy", self.enemy_type, Enemy.build_texture)
+
+    @staticmethod
+    def build_texture(enemy_type):
         texture = pygame.Surface((TILE_SIZE - 20, TILE_SIZE - 20), pygame.SRCALPHA)
 
-        if self.enemy_type == "guard":
+        if enemy_type == "guard":
             texture.fill(LIGHT_GRAY)
             # Detalhes do inimigo
             pygame.draw.rect(texture, DARK_GRAY, (10, 5, TILE_SIZE - 40, 10))  # Cabeça
             pygame.draw.rect(texture, (80, 80, 80), (15, 20, TILE_SIZE - 50, TILE_SIZE - 40))  # Corpo
             pygame.draw.circle(texture, RED, (TILE_SIZE // 2 - 10, TILE_SIZE // 2 - 10), 6)  # Alvo
 
-        elif self.enemy_type == "heavy":
+        elif enemy_type == "heavy":
             texture.fill(PURPLE)
             pygame.draw.rect(texture, (120, 0, 120), (5, 5, TILE_SIZE - 30, TILE_SIZE - 30))
             pygame.draw.circle(texture, RED, (TILE_SIZE // 2 - 10, TILE_SIZE // 2 - 10), 8)
             # Armadura
             pygame.draw.rect(texture, DARK_GRAY, (8, 8, TILE_SIZE - 36, 12))
 
-        elif self.enemy_type == "fast":
+        elif enemy_type == "fast":
             texture.fill(YELLOW)
             pygame.draw.polygon(texture, (200, 200, 0), [
                 (10, 10), (TILE_SIZE - 30, TILE_SIZE // 2 - 10), (10, TILE_SIZE - 30)
             ])
             pygame.draw.circle(texture, RED, (TILE_SIZE // 2 - 10, TILE_SIZE // 2 - 10), 5)
 
-        elif self.enemy_type == "sniper":
+        elif enemy_type == "sniper":
             texture.fill(DARK_GRAY)
             pygame.draw.rect(texture, (60, 60, 60), (5, 5, TILE_SIZE - 30, TILE_SIZE - 30))
             pygame.draw.circle(texture, GREEN, (TILE_SIZE // 2 - 10, TILE_SIZE // 2 - 10), 7)
@@ -797,84 +1596,36 @@ class Enemy:
         return texture
 
     def load_stun_texture(self):
+        return TEXTURES.get("enemy_stunned", None, Enemy.build_stun_texture)
+
+    @staticmethod
+    def build_stun_texture(variant):
         texture = pygame.Surface((TILE_SIZE - 20, TILE_SIZE - 20), pygame.SRCALPHA)
         texture.fill((150, 150, 150, 200))  # Cinza quando caído
         pygame.draw.ellipse(texture, (100, 100, 100), (10, 15, TILE_SIZE - 40, TILE_SIZE - 50))
         return texture
 
-    def take_damage(self, damage):
+    def take_damage(self, damage, cause=None):
         if self.state != EnemyState.ALIVE:
             return False
 
         self.health -= damage
         if self.health <= 0:
             self.state = EnemyState.DEAD
+            self.killed_by = cause
             return True
         return False
 
-    def update(self, player, walls, projectiles):
-        if self.state == EnemyState.DEAD:
-            return None
-        elif self.state == EnemyState.STUNNED:
-            self.stun_timer -= 1
-            if self.stun_timer <= 0:
-                self.state = EnemyState.ALIVE
-            return None
-
-        # IA melhorada: persegue o jogador se estiver no alcance
-        dx = player.x - self.x
-        dy = player.y - self.y
-        dist = (dx ** 2 + dy ** 2) ** 0.5
-
-        if dist < self.detection_range and player.state == PlayerState.ALIVE:
-            if self.enemy_type == "sniper" and dist < self.attack_range:
-                # Sniper fica parado e atira
-                if dist > 0:
-                    dx, dy = dx / dist, dy / dist
-
-                if self.attack_cooldown <= 0 and self.weapon and self.weapon.can_attack():
-                    self.attack_cooldown = self.weapon.get_cooldown()
-                    return self.create_projectile(dx, dy)
-            else:
-                # Movimento normal
-                if dist > 0:
-                    dx, dy = dx / dist, dy / dist
-
-                new_x = self.x + dx * self.speed
-                new_y = self.y + dy * self.speed
-
-                # Verificar colisão com paredes
-                future_rect = pygame.Rect(new_x, new_y, TILE_SIZE - 20, TILE_SIZE - 20)
-                collision = False
-
-                for wall in walls:
-                    if future_rect.colliderect(wall):
-                        collision = True
-                        break
-
-                if not collision:
-                    self.x = new_x
-                    self.y = new_y
-
-                # Atacar se estiver perto o suficiente
-                if dist < self.attack_range and self.attack_cooldown <= 0:
-                    if self.weapon and self.weapon.is_ranged:
-                        self.attack_cooldown = self.weapon.get_cooldown()
-                        return self.create_projectile(dx, dy)
-                    else:
-                        player.take_damage(999)  # Hit kill do inimigo
-                        self.attack_cooldown = 60
-
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-
-        return None
+    def update(self, player, wall_grid, projectiles, sight=None):
+        # Mesmo caminho do lote, restrito a este inimigo
+        fired = self._batch.update(player, wall_grid, [self._slot], sight=sight)
+        return fired[0] if fired else None
 
     def create_projectile(self, dx, dy):
         if self.weapon and self.weapon.attack():
-            return Projectile(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
-                              dx, dy, self.weapon.damage, self.weapon.range,
-                              self.weapon.weapon_type)
+            return PROJECTILE_POOL.acquire(self.x + TILE_SIZE // 2, self.y + TILE_SIZE // 2,
+                                           dx, dy, self.weapon.damage, self.weapon.range,
+                                           self.weapon.weapon_type)
         return None
 
     def draw(self, screen, camera_x, camera_y, is_marked=False):
@@ -894,64 +1645,946 @@ class Enemy:
             pygame.draw.rect(screen, RED, mark_rect, 3)
 
 
+class EnemyBatch:
+    """Estado dos inimigos em arrays NumPy: IA de todos atualizada em uma passada"""
+
+    def __init__(self, capacity=32):
+        self.count = 0
+        self.enemies = []
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.health = np.zeros(capacity, dtype=np.int32)
+        self.attack_cooldown = np.zeros(capacity, dtype=np.int32)
+        self.stun_timer = np.zeros(capacity, dtype=np.int32)
+        self.detection_range = np.zeros(capacity)
+        self.attack_range = np.zeros(capacity)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.sniper = np.zeros(capacity, dtype=bool)
+        self.alerted = np.zeros(capacity, dtype=bool)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.grid = EnemyGrid(self)
+
+    FIELDS = ("x", "y", "prev_x", "prev_y", "speed", "health", "attack_cooldown", "stun_timer",
+              "detection_range", "attack_range", "state", "sniper", "alerted", "active")
+
+    def add(self, enemy):
+        if self.count == len(self.x):
+            # Dobra a capacidade; os Enemy continuam válidos pois leem pelo índice
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        slot = self.count
+        self.count += 1
+        self.enemies.append(enemy)
+        self.active[slot] = True
+        self.grid.dirty = True
+        return slot
+
+    def store_previous(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+
+    def remove(self, enemy):
+        # Slots não são reaproveitados dentro do nível, para não invalidar referências antigas
+        self.active[enemy._slot] = False
+        self.grid.dirty = True
+
+    def update(self, player, wall_grid, slots=None, flow_field=None, sight=None):
+        if slots is None:
+            slots = np.flatnonzero(self.active[:self.count])
+        else:
+            slots = np.asarray(slots, dtype=np.intp)
+
+        state = self.state[slots]
+
+        # Inimigos atordoados: contagem regressiva e nada mais
+        stunned = slots[state == EnemyState.STUNNED.value]
+        if stunned.size:
+            self.stun_timer[stunned] -= 1
+            self.state[stunned[self.stun_timer[stunned] <= 0]] = EnemyState.ALIVE.value
+
+        alive = slots[state == EnemyState.ALIVE.value]
+        if alive.size == 0:
+            return []
+
+        # Persegue o jogador se estiver no alcance
+        old_x = self.x[alive]
+        old_y = self.y[alive]
+        dx = player.x - old_x
+        dy = player.y - old_y
+        dist = np.hypot(dx, dy)
+        safe_dist = np.where(dist > 0, dist, 1.0)
+        dx = dx / safe_dist
+        dy = dy / safe_dist
+
+        in_range = (dist < self.detection_range[alive]) & (player.state == PlayerState.ALIVE)
+        if sight is not None:
+            # Só nota o jogador quem tem linha de visão; quem já notou segue perseguindo
+            # (pelo campo de fluxo) mesmo depois de perdê-lo de vista
+            visible = np.zeros(alive.size, dtype=bool)
+            looking = np.flatnonzero(in_range)
+            if looking.size:
+                half = (TILE_SIZE - 20) / 2
+                visible[looking] = sight.visible(old_x[looking] + half, old_y[looking] + half,
+                                                 player.x + half, player.y + half)
+            self.alerted[alive[visible]] = True
+            chasing = in_range & self.alerted[alive]
+        else:
+            visible = np.ones(alive.size, dtype=bool)
+            chasing = in_range
+        in_attack_range = dist < self.attack_range[alive]
+        # Sniper fica parado e atira enquanto enxerga o jogador; sem visão, vai atrás dele
+        holding = chasing & self.sniper[alive] & in_attack_range & visible
+        moving = chasing & ~holding
+
+        if moving.any():
+            movers = np.flatnonzero(moving)
+            speed = self.speed[alive[movers]]
+            new_x = old_x[movers] + dx[movers] * speed
+            new_y = old_y[movers] + dy[movers] * speed
+            # Rota pelo campo de fluxo; sem rota (perto do jogador ou sem caminho) segue em linha reta
+            if flow_field is not None and flow_field.update(player.x, player.y):
+                flow_x, flow_y, routed = flow_field.advance(old_x[movers], old_y[movers], speed)
+                new_x = np.where(routed, flow_x, new_x)
+                new_y = np.where(routed, flow_y, new_y)
+            body = TILE_SIZE - 20
+            free = ~wall_grid.collides_many(new_x, new_y, body, body)
+
+            # Bateu: desliza ao longo da parede tentando cada eixo separadamente
+            blocked = np.flatnonzero(~free)
+            if blocked.size:
+                slide_x = ~wall_grid.collides_many(new_x[blocked], old_y[movers[blocked]], body, body)
+                new_y[blocked[slide_x]] = old_y[movers[blocked[slide_x]]]
+                free[blocked[slide_x]] = True
+                blocked = blocked[~slide_x]
+                slide_y = ~wall_grid.collides_many(old_x[movers[blocked]], new_y[blocked], body, body)
+                new_x[blocked[slide_y]] = old_x[movers[blocked[slide_y]]]
+                free[blocked[slide_y]] = True
+
+            self.x[alive[movers[free]]] = new_x[free]
+            self.y[alive[movers[free]]] = new_y[free]
+            self.grid.dirty = True
+
+        ready = self.attack_cooldown[alive] <= 0
+        acting = np.flatnonzero((holding | (moving & in_attack_range & visible)) & ready)
+
+        fired = []
+        returned = np.zeros(alive.size, dtype=bool)
+        for order in acting.tolist():
+            enemy = self.enemies[alive[order]]
+            weapon = enemy.weapon
+            if holding[order]:
+                if weapon and weapon.can_attack():
+                    enemy.attack_cooldown = weapon.get_cooldown()
+                    returned[order] = True
+                    projectile = enemy.create_projectile(float(dx[order]), float(dy[order]))
+                    if projectile:
+                        fired.append(projectile)
+            elif weapon and weapon.is_ranged:
+                enemy.attack_cooldown = weapon.get_cooldown()
+                returned[order] = True
+                projectile = enemy.create_projectile(float(dx[order]), float(dy[order]))
+                if projectile:
+                    fired.append(projectile)
+            else:
+                player.take_damage(999)  # Hit kill do inimigo
+                enemy.attack_cooldown = 60
+
+                if player.state != PlayerState.ALIVE:
+                    # Jogador caiu no meio do tick: quem vem depois não persegue nem ataca
+                    later = np.flatnonzero(moving)
+                    later = later[later > order]
+                    self.x[alive[later]] = old_x[later]
+                    self.y[alive[later]] = old_y[later]
+                    break
+
+        # Quem atirou retorna antes de descontar o cooldown
+        cooling = alive[~returned]
+        cooling = cooling[self.attack_cooldown[cooling] > 0]
+        self.attack_cooldown[cooling] -= 1
+
+        return fired
+
+
+class EnemyGrid:
+    """Hash espacial dos inimigos de um lote, refeito sob demanda quando alguém se move
+
+    Cada inimigo entra só na célula do seu canto superior esquerdo; as consultas alargam a
+    área pelo tamanho do corpo. Resultados saem em ordem de slot, que é a ordem da lista do
+    nível: empates se resolvem como nos laços antigos sobre level.enemies.
+    """
+
+    BODY = TILE_SIZE - 20
+
+    def __init__(self, batch, cell_size=ENEMY_CELL):
+        self.batch = batch
+        self.cell_size = cell_size
+        self.cells = {}
+        self.bounds = None
+        self.dirty = True
+
+    def rebuild(self):
+        self.dirty = False
+        self.cells = {}
+        batch = self.batch
+        slots = np.flatnonzero(batch.active[:batch.count])
+        if slots.size == 0:
+            self.bounds = None
+            return
+        cx = (batch.x[slots] // self.cell_size).astype(np.int64)
+        cy = (batch.y[slots] // self.cell_size).astype(np.int64)
+        self.bounds = (int(cx.min()), int(cy.min()), int(cx.max()), int(cy.max()))
+        cells = self.cells
+        for slot, cell in zip(slots.tolist(), zip(cx.tolist(), cy.tolist())):
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = [slot]
+            else:
+                bucket.append(slot)
+
+    def candidates(self, left, top, right, bottom):
+        """Slots (em ordem) cujo corpo pode tocar a área [left, right) x [top, bottom)"""
+        if self.dirty:
+            self.rebuild()
+        if self.bounds is None:
+            return []
+        size = self.cell_size
+        min_cx, min_cy, max_cx, max_cy = self.bounds
+        cx0 = max(int((left - self.BODY) // size), min_cx)
+        cy0 = max(int((top - self.BODY) // size), min_cy)
+        cx1 = min(int(right // size), max_cx)
+        cy1 = min(int(bottom // size), max_cy)
+        found = []
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
+
+    def query(self, left, top, right, bottom, state=None, whole=False):
+        """Inimigos cujo corpo se sobrepõe à área (whole: posições truncadas como no pygame.Rect)"""
+        batch = self.batch
+        xs, ys, states = batch.x, batch.y, batch.state
+        size = self.BODY
+        found = []
+        for slot in self.candidates(left, top, right, bottom):
+            if state is not None and states[slot] != state.value:
+                continue
+            ex = float(xs[slot])
+            ey = float(ys[slot])
+            if whole:
+                ex, ey = int(ex), int(ey)
+            if ex < right and ex + size > left and ey < bottom and ey + size > top:
+                found.append(batch.enemies[slot])
+        return found
+
+    def colliding(self, rect, state=None):
+        # Mesmo teste de rect.colliderect(pygame.Rect(enemy.x, enemy.y, corpo, corpo))
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+        return self.query(rect.left, rect.top, rect.right, rect.bottom, state, whole=True)
+
+    def within(self, x, y, radius, state=None):
+        """Inimigos com o canto superior esquerdo a menos de `radius` do ponto"""
+        batch = self.batch
+        xs, ys, states = batch.x, batch.y, batch.state
+        found = []
+        # Só o canto conta: a área de busca é [x - raio, x + raio) sem a folga do corpo
+        body = self.BODY
+        for slot in self.candidates(x - radius + body, y - radius + body, x + radius, y + radius):
+            if state is not None and states[slot] != state.value:
+                continue
+            if math.sqrt((float(xs[slot]) - x) ** 2 + (float(ys[slot]) - y) ** 2) < radius:
+                found.append(batch.enemies[slot])
+        return found
+
+    def nearest(self, x, y, max_distance=math.inf, state=None):
+        """Inimigo mais próximo (distância ao canto superior esquerdo), ou None
+
+        Varre anéis de células a partir da célula do ponto e para quando nenhuma célula
+        mais distante pode ter alguém mais perto; em empate vence o menor slot.
+        """
+        if self.dirty:
+            self.rebuild()
+        if self.bounds is None:
+            return None
+        batch = self.batch
+        xs, ys, states = batch.x, batch.y, batch.state
+        size = self.cell_size
+        min_cx, min_cy, max_cx, max_cy = self.bounds
+        center_x = int(x // size)
+        center_y = int(y // size)
+        reach = max(center_x - min_cx, max_cx - center_x, center_y - min_cy, max_cy - center_y)
+        if max_distance != math.inf:
+            reach = min(reach, int(max_distance // size) + 1)
+        best = None
+        for ring in range(reach + 1):
+            # Quem está em anéis além deste fica a pelo menos ring * size do ponto
+            if best is not None and best[0] < ring * size - size:
+                break
+            for cx in range(center_x - ring, center_x + ring + 1):
+                edge = cx in (center_x - ring, center_x + ring)
+                for cy in (range(center_y - ring, center_y + ring + 1) if edge else
+                           (center_y - ring, center_y + ring)):
+                    for slot in self.cells.get((cx, cy), ()):
+                        if state is not None and states[slot] != state.value:
+                            continue
+                        distance = math.sqrt((float(xs[slot]) - x) ** 2 + (float(ys[slot]) - y) ** 2)
+                        if distance < max_distance and (best is None or (distance, slot) < best):
+                            best = (distance, slot)
+        return batch.enemies[best[1]] if best else None
+
+
+# Cores (base, padrão) do fundo de cada personagem
+BACKGROUND_COLORS = {
+    CharacterType.VETERAN: ((25, 25, 45), (40, 40, 80)),  # Azul escuro
+    CharacterType.INVESTIGATOR: ((25, 45, 25), (40, 80, 40)),  # Verde escuro
+    CharacterType.SUCCESSOR: ((45, 25, 25), (80, 40, 40)),  # Vermelho escuro
+    CharacterType.EXECUTIONER: ((35, 25, 40), (60, 40, 80)),  # Roxo escuro
+    CharacterType.SOLDIER: ((60, 50, 30), (80, 70, 40)),  # Camuflagem base
+    "FINAL": ((30, 30, 30), (70, 20, 20)),  # Capítulo final: cinza com vermelho
+}
+
+
+class NoFreeSpaceError(RuntimeError):
+    pass
+
+
+class FreeSpaceMap:
+    """Posições (canto superior esquerdo) onde um corpo TILE_SIZE-20 cabe sem tocar paredes"""
+
+    def __init__(self, walls, bounds, body_size=TILE_SIZE - 20, step=4):
+        left, top, right, bottom = bounds
+        self.step = step
+        self.xs = np.arange(left, right + 1, step)
+        self.ys = np.arange(top, bottom + 1, step)
+
+        # Cada parede bloqueia as posições em que o corpo a tocaria (a parede "inflada" pelo
+        # tamanho do corpo): wall.left - body < x < wall.right, igual ao colliderect.
+        # Uma fatia por parede na malha, sem rasterizar pixels
+        self.free = np.ones((len(self.xs), len(self.ys)), dtype=bool)
+        for wall in walls:
+            i0 = np.searchsorted(self.xs, wall.left - body_size, side="right")
+            i1 = np.searchsorted(self.xs, wall.right, side="left")
+            j0 = np.searchsorted(self.ys, wall.top - body_size, side="right")
+            j1 = np.searchsorted(self.ys, wall.bottom, side="left")
+            self.free[i0:i1, j0:j1] = False
+        self.candidates = np.flatnonzero(self.free)
+
+    def reserve(self, x, y, distance):
+        # Tira do mapa as posições a menos de `distance` (em cada eixo) de (x, y)
+        i0 = np.searchsorted(self.xs, x - distance, side="right")
+        i1 = np.searchsorted(self.xs, x + distance, side="left")
+        j0 = np.searchsorted(self.ys, y - distance, side="right")
+        j1 = np.searchsorted(self.ys, y + distance, side="left")
+        self.free[i0:i1, j0:j1] = False
+
+    def sample(self, rng):
+        # Amostras da lista de candidatas; reservas recentes só forçam recalcular a lista
+        # quando várias tentativas seguidas caem em posições já ocupadas
+        for _ in range(8):
+            if len(self.candidates) == 0:
+                break
+            index = self.candidates[rng.randrange(len(self.candidates))]
+            if self.free.flat[index]:
+                return self.position(index)
+
+        self.candidates = np.flatnonzero(self.free)
+        if len(self.candidates) == 0:
+            raise NoFreeSpaceError("Não há espaço livre no nível para posicionar mais entidades")
+        return self.position(self.candidates[rng.randrange(len(self.candidates))])
+
+    def position(self, index):
+        i, j = divmod(int(index), len(self.ys))
+        return int(self.xs[i]), int(self.ys[j])
+
+
+class FlowField:
+    """Campo de fluxo compartilhado: BFS a partir da célula do jogador sobre a malha de posições livres
+
+    Cada nó da malha guarda o próximo nó rumo ao jogador; os inimigos só consultam o nó mais
+    próximo, então o custo do caminho não cresce com o número de inimigos.
+    """
+
+    OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+    UNREACHED = np.iinfo(np.int32).max
+
+    def __init__(self, walls, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, body_size=TILE_SIZE - 20, step=NAV_STEP,
+                 window=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        lattice = FreeSpaceMap(walls, (0, 0, width - body_size, height - body_size), body_size, step)
+        self.step = step
+        self.xs = lattice.xs
+        self.ys = lattice.ys
+        self.lattice = lattice.free
+        # O campo cobre uma janela (padrão: uma tela) de nós em volta do jogador, ou o nível
+        # inteiro se couber nela; inimigos fora da janela perseguem em linha reta
+        self.shape = (min(len(self.xs), window[0] // step + 1), min(len(self.ys), window[1] // step + 1))
+        self.window = None
+
+        self.goal_cell = None
+        self.valid = False
+        self.next_x = None
+        self.next_y = None
+        self.routed = None
+        self.replans = 0
+
+    def place_window(self, cell):
+        # Janela centrada na célula do jogador, presa às bordas do nível
+        corner = []
+        for axis, coords in enumerate((self.xs, self.ys)):
+            center = int(((cell[axis] + 0.5) * NAV_REPLAN - coords[0]) // self.step)
+            corner.append(min(max(center - self.shape[axis] // 2, 0), len(coords) - self.shape[axis]))
+        if tuple(corner) != self.window:
+            self.window = tuple(corner)
+            self.prepare()
+
+    def prepare(self):
+        # Grafo da janela atual em índices planos
+        i0, j0 = self.window
+        width, height = self.shape
+        step = self.step
+
+        # Malha com uma borda de nós bloqueados: vizinhos nunca saem do array
+        padded = np.zeros((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.lattice[i0:i0 + width, j0:j0 + height]
+        self.stride = padded.shape[1]
+        self.free = padded.ravel()
+        self.offsets = np.array([dx * self.stride + dy for dx, dy in self.OFFSETS])
+        node = np.arange(self.free.size)
+        self.node_x = (node // self.stride - 1 + i0) * step + self.xs[0]
+        self.node_y = (node % self.stride - 1 + j0) * step + self.ys[0]
+
+        # Arestas entre nós livres; diagonal só se os dois ortogonais também estão livres (sem cortar quina)
+        self.neighbor_free = np.stack([np.roll(self.free, -offset) for offset in self.offsets])
+        self.passable = self.neighbor_free & self.free
+        for k, (dx, dy) in enumerate(self.OFFSETS):
+            if dx and dy:
+                self.passable[k] &= np.roll(self.free, -dx * self.stride) & np.roll(self.free, -dy)
+        self.edges = np.ascontiguousarray(self.passable.T)  # (nó, vizinho): uma consulta por camada da BFS
+
+    def seeds(self, cell):
+        # Nós livres em volta da célula do jogador (só dependem da célula, não da posição exata)
+        for margin in (NAV_REPLAN // 2, NAV_REPLAN * 3 // 2):
+            left = cell[0] * NAV_REPLAN - margin
+            top = cell[1] * NAV_REPLAN - margin
+            right = (cell[0] + 1) * NAV_REPLAN + margin
+            bottom = (cell[1] + 1) * NAV_REPLAN + margin
+            near = np.flatnonzero(self.free & (self.node_x >= left) & (self.node_x < right) &
+                                  (self.node_y >= top) & (self.node_y < bottom))
+            if near.size:
+                return near
+        return near
+
+    def update(self, player_x, player_y):
+        """Refaz o campo se o jogador mudou de célula; devolve se há campo utilizável"""
+        cell = (int(player_x // NAV_REPLAN), int(player_y // NAV_REPLAN))
+        if cell != self.goal_cell:
+            self.goal_cell = cell
+            self.place_window(cell)
+            self.build(self.seeds(cell), (cell[0] + 0.5) * NAV_REPLAN, (cell[1] + 0.5) * NAV_REPLAN)
+        return self.valid
+
+    def build(self, seeds, goal_x, goal_y):
+        with TRACER.span("flow_field", "nav", seeds=int(seeds.size)) as span:
+            self.replans += 1
+            self.valid = seeds.size > 0
+            if not self.valid:
+                return
+
+            # BFS em camadas: cada camada expande a fronteira inteira de uma vez
+            distance = np.full(self.free.size, self.UNREACHED, dtype=np.int32)
+            distance[seeds] = 0
+            frontier = seeds
+            layer = 0
+            while frontier.size:
+                layer += 1
+                reached = (frontier[:, None] + self.offsets)[self.edges[frontier]]
+                reached = np.unique(reached[distance[reached] == self.UNREACHED])
+                distance[reached] = layer
+                frontier = reached
+
+            # Próximo nó: vizinho de menor distância; empates vão para o mais alinhado com o jogador.
+            # Nós bloqueados (inimigo encostado numa parede) apontam para o vizinho livre mais próximo
+            to_goal_x = goal_x - self.node_x
+            to_goal_y = goal_y - self.node_y
+            to_goal = np.maximum(np.hypot(to_goal_x, to_goal_y), 1e-9)
+            best_key = np.full(self.free.size, np.inf)
+            best = np.full(self.free.size, -1, dtype=np.int64)
+            for k, (dx, dy) in enumerate(self.OFFSETS):
+                neighbor = np.roll(distance, -self.offsets[k])
+                allowed = np.where(self.free, self.passable[k], self.neighbor_free[k]) & (neighbor != self.UNREACHED)
+                alignment = (dx * to_goal_x + dy * to_goal_y) / (to_goal * math.hypot(dx, dy))
+                key = np.where(allowed, neighbor * 4.0 - alignment, np.inf)
+                better = key < best_key
+                best_key[better] = key[better]
+                best[better] = k
+
+            # Nós já na célula do jogador (ou sem caminho) ficam sem rota: perseguição direta
+            self.routed = (best >= 0) & ~(self.free & (distance == 0))
+            step_x = np.array([dx for dx, dy in self.OFFSETS])[best] * self.step
+            step_y = np.array([dy for dx, dy in self.OFFSETS])[best] * self.step
+            self.next_x = (self.node_x + step_x).astype(float)
+            self.next_y = (self.node_y + step_y).astype(float)
+            span.set(layers=layer, reached=int((distance != self.UNREACHED).sum()))
+
+    def targets(self, xs, ys):
+        # Próximo nó a partir do nó mais próximo de cada posição: consulta O(1) por inimigo
+        i = np.rint((xs - self.xs[0]) / self.step).astype(np.intp) - self.window[0]
+        j = np.rint((ys - self.ys[0]) / self.step).astype(np.intp) - self.window[1]
+        inside = (i >= 0) & (i < self.shape[0]) & (j >= 0) & (j < self.shape[1])
+        node = (np.clip(i, 0, self.shape[0] - 1) + 1) * self.stride + np.clip(j, 0, self.shape[1] - 1) + 1
+        return self.next_x[node], self.next_y[node], self.routed[node] & inside
+
+    def advance(self, xs, ys, distance):
+        """Anda `distance` px pela rota; devolve as novas posições e quais posições tinham rota
+
+        Quem chega a um nó no meio do passo pousa exatamente nele e segue com o resto rumo ao
+        nó seguinte, então a rota fica sobre a malha (e passa por vãos justos) sem perder velocidade.
+        """
+        target_x, target_y, routed = self.targets(xs, ys)
+        to_x = target_x - xs
+        to_y = target_y - ys
+        reach = np.hypot(to_x, to_y)
+        routed = routed & (reach > 0)
+        scale = np.where(routed, distance / np.where(routed, reach, 1.0), 0.0)
+        # Ruído de ponto flutuante no eixo da rota (655.9999 em vez de 656) viraria 1px dentro da parede
+        new_x = np.where(np.abs(to_x) < 1e-6, target_x, xs + to_x * scale)
+        new_y = np.where(np.abs(to_y) < 1e-6, target_y, ys + to_y * scale)
+
+        arrive = np.flatnonzero(routed & (reach <= distance))
+        if arrive.size:
+            node_x = target_x[arrive]
+            node_y = target_y[arrive]
+            after_x, after_y, onward = self.targets(node_x, node_y)
+            leg_x = after_x - node_x
+            leg_y = after_y - node_y
+            leg = np.hypot(leg_x, leg_y)
+            onward &= leg > 0
+            rest = np.where(onward, (distance[arrive] - reach[arrive]) / np.where(onward, leg, 1.0), 0.0)
+            new_x[arrive] = node_x + leg_x * rest
+            new_y[arrive] = node_y + leg_y * rest
+        return new_x, new_y, routed
+
+
+class LineOfSight:
+    """Linha de visão em lote sobre uma grade de ocupação das paredes
+
+    Os raios ligam os centros das células (LOS_CELL) do observador e do alvo e percorrem a
+    grade de ocupação (LOS_STEP) sem pular células; o resultado fica em cache por célula do
+    observador até o alvo mudar de célula.
+    """
+
+    def __init__(self, walls, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, step=LOS_STEP, cell=LOS_CELL):
+        self.step = step
+        self.cell = cell
+        # Célula opaca se qualquer parede a toca
+        self.opaque = np.zeros((width // step + 1, height // step + 1), dtype=bool)
+        for wall in walls:
+            self.opaque[max(wall.left // step, 0):max((wall.right - 1) // step + 1, 0),
+                        max(wall.top // step, 0):max((wall.bottom - 1) // step + 1, 0)] = True
+        # Visibilidade de cada célula de observador até a célula atual do alvo: -1 = não consultada
+        self.cache = np.full((width // cell + 1, height // cell + 1), -1, dtype=np.int8)
+        self.target_cell = None
+        self.rays = 0
+
+    def cells(self, xs, ys):
+        i = np.clip(np.floor_divide(xs, self.cell).astype(np.intp), 0, self.cache.shape[0] - 1)
+        j = np.clip(np.floor_divide(ys, self.cell).astype(np.intp), 0, self.cache.shape[1] - 1)
+        return i, j
+
+    def visible(self, xs, ys, target_x, target_y):
+        """Para cada observador (centros em xs, ys), se o alvo está à vista"""
+        i, j = self.cells(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        target_i, target_j = self.cells(np.array([target_x]), np.array([target_y]))
+        target = (int(target_i[0]), int(target_j[0]))
+        if target != self.target_cell:
+            self.target_cell = target
+            self.cache.fill(-1)
+
+        known = self.cache[i, j]
+        unknown = known < 0
+        if unknown.any():
+            # Um raio por célula de observador ainda sem resposta
+            flat = np.unique(i[unknown] * self.cache.shape[1] + j[unknown])
+            ci, cj = np.divmod(flat, self.cache.shape[1])
+            center = self.cell / 2
+            self.cache[ci, cj] = self.cast(ci * self.cell + center, cj * self.cell + center,
+                                           target[0] * self.cell + center, target[1] * self.cell + center)
+            known = self.cache[i, j]
+        return known == 1
+
+    def cast(self, x0, y0, x1, y1):
+        # Travessia exata da grade para vários raios de uma vez: toda célula atravessada é
+        # vizinha de algum cruzamento do raio com uma linha da grade, então basta testar as
+        # duas células de cada lado de cada cruzamento (mais a célula de partida)
+        with TRACER.span("line_of_sight", "nav", rays=len(x0)):
+            self.rays += len(x0)
+            step = self.step
+            last_i, last_j = self.opaque.shape[0] - 1, self.opaque.shape[1] - 1
+            start_i = np.clip(np.floor(x0 / step).astype(np.intp), 0, last_i)
+            start_j = np.clip(np.floor(y0 / step).astype(np.intp), 0, last_j)
+            blocked = self.opaque[start_i, start_j].copy()
+
+            for start, delta, across, across_delta, swap in ((x0, x1 - x0, y0, y1 - y0, False),
+                                                             (y0, y1 - y0, x0, x1 - x0, True)):
+                end = start + delta
+                first = np.floor(np.minimum(start, end) / step) + 1
+                last = np.ceil(np.maximum(start, end) / step) - 1
+                lines = first[:, None] + np.arange(max(int((last - first).max()) + 1, 0))
+                crossing = lines <= last[:, None]
+                t = (lines * step - start[:, None]) / np.where(delta != 0, delta, 1.0)[:, None]
+                row = np.floor((across[:, None] + across_delta[:, None] * t) / step).astype(np.intp)
+                before = lines.astype(np.intp) - 1
+                if swap:
+                    row = np.clip(row, 0, last_i)
+                    hit = (self.opaque[row, np.clip(before, 0, last_j)] |
+                           self.opaque[row, np.clip(before + 1, 0, last_j)])
+                else:
+                    row = np.clip(row, 0, last_j)
+                    hit = (self.opaque[np.clip(before, 0, last_i), row] |
+                           self.opaque[np.clip(before + 1, 0, last_i), row])
+                blocked |= (hit & crossing).any(axis=1)
+            return ~blocked
+
+
+class WallGrid:
+    """Grade uniforme (buckets) sobre a geometria estática das paredes"""
+
+    # Folga no registro das paredes: consultas por segmento (projéteis com raio)
+    # continuam enxergando paredes que começam logo depois da borda da célula
+    PADDING = Projectile.RADIUS + 1
+
+    def __init__(self, walls, cell_size=TILE_SIZE):
+        self.walls = walls
+        self.cell_size = cell_size
+        self.cells = {}
+
+        # Cada parede é registrada em todas as células que ela cobre
+        for index, wall in enumerate(walls):
+            for cell in self.cells_for(wall.inflate(self.PADDING * 2, self.PADDING * 2)):
+                self.cells.setdefault(cell, []).append(index)
+
+        self.build_table()
+
+    def build_table(self):
+        # Mesma grade em forma de tabela NumPy (célula -> índices de paredes, -1 = vazio)
+        # para testar muitos retângulos de uma vez
+        self.wall_left = np.array([wall.left for wall in self.walls], dtype=np.int64)
+        self.wall_top = np.array([wall.top for wall in self.walls], dtype=np.int64)
+        self.wall_right = np.array([wall.right for wall in self.walls], dtype=np.int64)
+        self.wall_bottom = np.array([wall.bottom for wall in self.walls], dtype=np.int64)
+
+        if not self.cells:
+            self.origin = (0, 0)
+            self.table = np.full((1, 1, 1), -1, dtype=np.int32)
+            return
+
+        xs = [cx for cx, cy in self.cells]
+        ys = [cy for cx, cy in self.cells]
+        self.origin = (min(xs), min(ys))
+        depth = max(len(indices) for indices in self.cells.values())
+        self.table = np.full((max(ys) - min(ys) + 1, max(xs) - min(xs) + 1, depth), -1, dtype=np.int32)
+        for (cx, cy), indices in self.cells.items():
+            self.table[cy - self.origin[1], cx - self.origin[0], :len(indices)] = indices
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield cx, cy
+
+    def cells_on_segment(self, x0, y0, x1, y1):
+        # DDA (Amanatides-Woo): células cruzadas pelo segmento, em ordem, com o t de entrada
+        size = self.cell_size
+        cx, cy = int(x0 // size), int(y0 // size)
+        end_cx, end_cy = int(x1 // size), int(y1 // size)
+        dx, dy = x1 - x0, y1 - y0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        t_max_x = ((cx + (dx > 0)) * size - x0) / dx if dx else math.inf
+        t_max_y = ((cy + (dy > 0)) * size - y0) / dy if dy else math.inf
+        t_delta_x = size / abs(dx) if dx else math.inf
+        t_delta_y = size / abs(dy) if dy else math.inf
+
+        yield cx, cy, 0.0
+        while (cx, cy) != (end_cx, end_cy):
+            if t_max_x < t_max_y:
+                t = t_max_x
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                t = t_max_y
+                cy += step_y
+                t_max_y += t_delta_y
+            if t > 1:
+                break
+            yield cx, cy, t
+
+    def query_indices(self, rect):
+        # Índices das paredes candidatas nas células tocadas pelo retângulo (sem repetição, em ordem)
+        found = set()
+        for cell in self.cells_for(rect):
+            found.update(self.cells.get(cell, ()))
+        return sorted(found)
+
+    def query(self, rect):
+        return [self.walls[index] for index in self.query_indices(rect)]
+
+    def collides_many(self, xs, ys, width, height):
+        # Versão vetorizada de collides() para retângulos de mesmo tamanho
+        # (posições truncadas como no pygame.Rect)
+        left = np.trunc(xs).astype(np.int64)
+        top = np.trunc(ys).astype(np.int64)
+        right = left + width
+        bottom = top + height
+        hit = np.zeros(left.shape, dtype=bool)
+        if not self.walls or left.size == 0:
+            return hit
+
+        size = self.cell_size
+        rows, cols, _ = self.table.shape
+        cx0 = left // size
+        cy0 = top // size
+        cx1 = (right - 1) // size
+        cy1 = (bottom - 1) // size
+        for ox in range((width - 1) // size + 2):
+            for oy in range((height - 1) // size + 2):
+                cx = cx0 + ox
+                cy = cy0 + oy
+                col = cx - self.origin[0]
+                row = cy - self.origin[1]
+                valid = (cx <= cx1) & (cy <= cy1) & (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+                if not valid.any():
+                    continue
+                candidates = self.table[np.where(valid, row, 0), np.where(valid, col, 0)]
+                candidates = np.where(valid[:, None], candidates, -1)
+                index = np.maximum(candidates, 0)
+                overlap = ((candidates >= 0) &
+                           (left[:, None] < self.wall_right[index]) & (self.wall_left[index] < right[:, None]) &
+                           (top[:, None] < self.wall_bottom[index]) & (self.wall_top[index] < bottom[:, None]))
+                hit |= overlap.any(axis=1)
+        return hit
+
+    def collides(self, rect):
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        walls = self.walls
+        for cell in self.cells_for(rect):
+            for index in self.cells.get(cell, ()):
+                if rect.colliderect(walls[index]):
+                    return True
+        return False
+
+
+class ChunkLayer:
+    """Fundo e paredes do nível em pedaços de CHUNK_SIZE assados sob demanda
+
+    Só os pedaços em volta da câmera ficam em memória (LRU com teto MAX_CHUNKS),
+    então a memória das superfícies não cresce com o tamanho do nível.
+    """
+
+    def __init__(self, character_type, seed, walls, wall_grid, wall_textures, width, height):
+        self.character_type = character_type
+        self.seed = seed
+        self.walls = walls
+        self.wall_grid = wall_grid
+        self.wall_textures = wall_textures
+        self.width = width
+        self.height = height
+        self.surfaces = OrderedDict()
+        self.baked = 0
+        self.evicted = 0
+
+    def chunk_range(self, rect, keep=0):
+        # Pedaços que tocam o retângulo, mais `keep` em volta, limitados ao nível
+        i0 = max(int(rect.left // CHUNK_SIZE) - keep, 0)
+        j0 = max(int(rect.top // CHUNK_SIZE) - keep, 0)
+        i1 = min(int((rect.right - 1) // CHUNK_SIZE) + keep, (self.width - 1) // CHUNK_SIZE)
+        j1 = min(int((rect.bottom - 1) // CHUNK_SIZE) + keep, (self.height - 1) // CHUNK_SIZE)
+        return range(i0, i1 + 1), range(j0, j1 + 1)
+
+    def surface(self, i, j):
+        surface = self.surfaces.get((i, j))
+        if surface is not None:
+            self.surfaces.move_to_end((i, j))
+            return surface
+
+        surface = self.surfaces[(i, j)] = self.bake(i, j)
+        while len(self.surfaces) > MAX_CHUNKS:
+            self.surfaces.popitem(last=False)
+            self.evicted += 1
+        return surface
+
+    def bake(self, i, j):
+        # Fundo do pedaço + paredes que o tocam (recortadas), na mesma ordem de desenho do nível inteiro
+        left, top = i * CHUNK_SIZE, j * CHUNK_SIZE
+        rect = pygame.Rect(left, top, min(CHUNK_SIZE, self.width - left), min(CHUNK_SIZE, self.height - top))
+        with TRACER.span("bake_chunk", "level", chunk=[i, j]):
+            surface = Level.build_background(self.character_type, self.seed, rect)
+            for index in self.wall_grid.query_indices(rect):
+                wall = self.walls[index]
+                wall_texture = self.wall_textures[index % len(self.wall_textures)]
+                surface.set_clip(wall.move(-left, -top))
+                for x in range(wall.left, wall.right, TILE_SIZE):
+                    for y in range(wall.top, wall.bottom, TILE_SIZE):
+                        surface.blit(wall_texture, (x - left, y - top))
+            surface.set_clip(None)
+        self.baked += 1
+        return surface
+
+    def preload(self, view):
+        columns, rows = self.chunk_range(view)
+        for i in columns:
+            for j in rows:
+                self.surface(i, j)
+
+    def draw(self, screen, camera_x, camera_y):
+        view = pygame.Rect(camera_x, camera_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        columns, rows = self.chunk_range(view)
+        for i in columns:
+            for j in rows:
+                screen.blit(self.surface(i, j), (i * CHUNK_SIZE - camera_x, j * CHUNK_SIZE - camera_y))
+
+        # Descarta o que ficou longe e adianta um pedaço do anel em volta por quadro
+        columns, rows = self.chunk_range(view, CHUNK_KEEP)
+        for key in [key for key in self.surfaces if key[0] not in columns or key[1] not in rows]:
+            del self.surfaces[key]
+            self.evicted += 1
+        for i in columns:
+            for j in rows:
+                if (i, j) not in self.surfaces:
+                    self.surface(i, j)
+                    return
+
+
 class Level:
-    def __init__(self, level_num, character_type, legacy_points=0):
+    # Camadas de pedaços já assadas, por (nível, personagem, semente, blocos): reiniciar reaproveita
+    chunk_layers = OrderedDict()
+    chunk_layers_lock = threading.Lock()
+    MAX_CHUNK_LAYERS = 2
+
+    def __init__(self, level_num, character_type, legacy_points=0, seed=None, blocks=None):
+        start = time.perf_counter()
         self.level_num = level_num
         self.character_type = character_type
+        self.seed = random.getrandbits(32) if seed is None else seed
+        # Gerador próprio: o mesmo nível sai igual em qualquer thread, dada a semente
+        self.rng = random.Random(self.seed)
+        # Nível feito de blocos do tamanho da tela, cada um com o layout do tema; a campanha usa
+        # uma tela só, mapas maiores são pedidos explicitamente (blocks)
+        self.blocks = tuple(blocks) if blocks else (1, 1)
+        self.width = self.blocks[0] * SCREEN_WIDTH
+        self.height = self.blocks[1] * SCREEN_HEIGHT
         self.walls = []
+        self.wall_grid = WallGrid(self.walls)
         self.enemies = []
+        self.enemy_batch = EnemyBatch()
         self.weapon_pickups = []
         self.spawn_point = (100, 100)
-        self.exit_point = (900, 600)
+        self.exit_point = (self.width - 124, self.height - 168)
         self.legacy_points = legacy_points
-        self.background_texture = self.create_background()
+        self.ticks = 0
         self.wall_textures = self.create_wall_textures()
 
         self.generate_level()
-
-    def create_background(self):
-        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-        # Padrão baseado no tipo de personagem e número do nível
-        if self.character_type == CharacterType.VETERAN:
-            base_color = (25, 25, 45)  # Azul escuro
-            pattern_color = (40, 40, 80)
-        elif self.character_type == CharacterType.INVESTIGATOR:
-            base_color = (25, 45, 25)  # Verde escuro
-            pattern_color = (40, 80, 40)
-        elif self.character_type == CharacterType.SUCCESSOR:
-            base_color = (45, 25, 25)  # Vermelho escuro
-            pattern_color = (80, 40, 40)
-        elif self.character_type == CharacterType.EXECUTIONER:
-            base_color = (35, 25, 40)  # Roxo escuro
-            pattern_color = (60, 40, 80)
-        elif self.character_type == CharacterType.SOLDIER:
-            base_color = (60, 50, 30)  # Camuflagem base
-            pattern_color = (80, 70, 40)
-
-        background.fill(base_color)
-
-        # Padrão de textura mais elaborado
-        for x in range(0, SCREEN_WIDTH, 40):
-            for y in range(0, SCREEN_HEIGHT, 40):
-                if (x // 40 + y // 40) % 2 == 0:
-                    pygame.draw.rect(background, pattern_color, (x, y, 20, 20))
-                # Adicionar ruído
-                for i in range(3):
-                    rx = random.randint(x, x + 39)
-                    ry = random.randint(y, y + 39)
-                    brightness = random.randint(-15, 15)
-                    noise_color = (
-                        max(0, min(255, base_color[0] + brightness)),
-                        max(0, min(255, base_color[1] + brightness)),
-                        max(0, min(255, base_color[2] + brightness))
-                    )
-                    pygame.draw.rect(background, noise_color, (rx, ry, 2, 2))
-
+        if TRACER.enabled:
+            TRACER.complete("Level.__init__", start, category="level", level_num=level_num, seed=self.seed)
+
+    def snapshot(self):
+        # Paredes e texturas saem da semente; só o estado que muda durante a partida é guardado
+        return {"level_num": self.level_num, "character_type": character_name(self.character_type),
+                "legacy_points": self.legacy_points, "seed": self.seed, "blocks": list(self.blocks),
+                "ticks": self.ticks, "rng": rng_state(self.rng),
+                "enemies": [enemy.snapshot() for enemy in self.enemies],
+                "pickups": [[x, y, weapon_type.name] for x, y, weapon_type in self.weapon_pickups]}
+
+    @classmethod
+    def from_snapshot(cls, data):
+        level = cls(data["level_num"], character_from_name(data["character_type"]), data["legacy_points"],
+                    data["seed"], data["blocks"])
+        level.ticks = data["ticks"]
+        set_rng_state(level.rng, data["rng"])
+        level.enemy_batch = EnemyBatch()
+        level.enemies = [Enemy.from_snapshot(enemy, level.enemy_batch) for enemy in data["enemies"]]
+        level.weapon_pickups = [(x, y, WeaponType[name]) for x, y, name in data["pickups"]]
+        return level
+
+    @property
+    def enemy_grid(self):
+        # O lote é recriado ao gerar o nível e ao restaurar um snapshot; o hash vem junto
+        return self.enemy_batch.grid
+
+    def create_chunk_layer(self):
+        # Memoizado: reiniciar o nível reaproveita os pedaços já assados
+        key = (self.level_num, self.character_type, self.seed, self.blocks)
+        with Level.chunk_layers_lock:
+            layer = Level.chunk_layers.get(key)
+            if layer is not None:
+                Level.chunk_layers.move_to_end(key)
+                return layer
+
+        layer = ChunkLayer(self.character_type, self.seed, self.walls, self.wall_grid, self.wall_textures,
+                           self.width, self.height)
+        # Os pedaços da entrada já saem prontos (na thread de pré-carregamento, quando houver)
+        layer.preload(pygame.Rect(self.spawn_point[0] - SCREEN_WIDTH // 2, self.spawn_point[1] - SCREEN_HEIGHT // 2,
+                                  SCREEN_WIDTH, SCREEN_HEIGHT))
+        with Level.chunk_layers_lock:
+            Level.chunk_layers[key] = layer
+            if len(Level.chunk_layers) > Level.MAX_CHUNK_LAYERS:
+                Level.chunk_layers.popitem(last=False)
+        return layer
+
+    @staticmethod
+    def build_background(character_type, seed, rect):
+        # Padrão baseado no tipo de personagem para o trecho `rect` do nível, gerado em poucas
+        # operações NumPy sobre pixels já no formato da superfície (inteiros mapeados)
+        base_color, pattern_color = BACKGROUND_COLORS[character_type]
+        background = pygame.Surface(rect.size)
+        rng = np.random.default_rng([seed, rect.left // CHUNK_SIZE, rect.top // CHUNK_SIZE])
+
+        # Xadrez: bloco 80x80 com o quadrado 20x20 nas células 40x40 alternadas, alinhado ao nível
+        tile = np.full((80, 80), background.map_rgb(base_color), dtype=np.uint32)
+        tile[0:20, 0:20] = background.map_rgb(pattern_color)
+        tile[40:60, 40:60] = background.map_rgb(pattern_color)
+        pixels = tile[(np.arange(rect.left, rect.right) % 80)[:, None], (np.arange(rect.top, rect.bottom) % 80)[None, :]]
+
+        # Ruído: 3 pontos 2x2 por célula 40x40 com brilho aleatório (-15..15)
+        noise_palette = np.array([
+            background.map_rgb(tuple(max(0, min(255, channel + brightness)) for channel in base_color))
+            for brightness in range(-15, 16)
+        ], dtype=np.uint32)
+        first_x = rect.left // 40 * 40
+        first_y = rect.top // 40 * 40
+        cells_x = len(range(first_x, rect.right, 40))
+        cells_y = len(range(first_y, rect.bottom, 40))
+        shape = (cells_x, cells_y, 3)
+        rx = ((first_x - rect.left + np.arange(cells_x) * 40)[:, None, None] + rng.integers(0, 40, shape)).ravel()
+        ry = ((first_y - rect.top + np.arange(cells_y) * 40)[None, :, None] + rng.integers(0, 40, shape)).ravel()
+        noise = noise_palette[rng.integers(0, 31, shape).ravel()]
+        for ox in (0, 1):
+            for oy in (0, 1):
+                px = rx + ox
+                py = ry + oy
+                inside = (px >= 0) & (px < rect.width) & (py >= 0) & (py < rect.height)
+                pixels[px[inside], py[inside]] = noise[inside]
+
+        pygame.surfarray.blit_array(background, pixels)
         return background
 
     def create_wall_textures(self):
+        return TEXTURES.get("walls", None, Level.build_wall_textures)
+
+    @staticmethod
+    def build_wall_textures(variant):
         textures = []
+        rng = random.Random(0)
         # Criar diferentes texturas para paredes
         for i in range(3):
             texture = pygame.Surface((TILE_SIZE, TILE_SIZE))
@@ -966,8 +2599,8 @@ class Level:
                 # Concreto
                 texture.fill((100, 100, 100))
                 for _ in range(20):
-                    x = random.randint(0, TILE_SIZE - 4)
-                    y = random.randint(0, TILE_SIZE - 4)
+                    x = rng.randint(0, TILE_SIZE - 4)
+                    y = rng.randint(0, TILE_SIZE - 4)
                     pygame.draw.rect(texture, (120, 120, 120), (x, y, 2, 2))
             else:
                 # Metal
@@ -979,19 +2612,21 @@ class Level:
         return textures
 
     def generate_level(self):
+        start = time.perf_counter()
         # Limpar level anterior
         self.walls = []
         self.enemies = []
+        self.enemy_batch = EnemyBatch()
         self.weapon_pickups = []
 
         # Gerar paredes básicas (bordas)
-        for x in range(0, SCREEN_WIDTH, TILE_SIZE):
+        for x in range(0, self.width, TILE_SIZE):
             self.walls.append(pygame.Rect(x, 0, TILE_SIZE, TILE_SIZE))
-            self.walls.append(pygame.Rect(x, SCREEN_HEIGHT - TILE_SIZE, TILE_SIZE, TILE_SIZE))
+            self.walls.append(pygame.Rect(x, self.height - TILE_SIZE, TILE_SIZE, TILE_SIZE))
 
-        for y in range(TILE_SIZE, SCREEN_HEIGHT - TILE_SIZE, TILE_SIZE):
+        for y in range(TILE_SIZE, self.height - TILE_SIZE, TILE_SIZE):
             self.walls.append(pygame.Rect(0, y, TILE_SIZE, TILE_SIZE))
-            self.walls.append(pygame.Rect(SCREEN_WIDTH - TILE_SIZE, y, TILE_SIZE, TILE_SIZE))
+            self.walls.append(pygame.Rect(self.width - TILE_SIZE, y, TILE_SIZE, TILE_SIZE))
 
         # Gerar layout baseado no nível e personagem
         level_methods = [
@@ -1000,19 +2635,33 @@ class Level:
             self._generate_military_layout  # Novo layout militar
         ]
 
+        # Cada bloco recebe o layout do tema, gerado na origem e deslocado para o lugar
         method_index = (self.level_num - 1) % len(level_methods)
-        level_methods[method_index]()
-
-        # Gerar inimigos baseado nos pontos de legado
+        for block_y in range(self.blocks[1]):
+            for block_x in range(self.blocks[0]):
+                first = len(self.walls)
+                level_methods[method_index]()
+                for wall in self.walls[first:]:
+                    wall.move_ip(block_x * SCREEN_WIDTH, block_y * SCREEN_HEIGHT)
+
+        # Paredes são estáticas: a grade, a camada desenhada e o espaço livre são construídos uma única vez
+        self.wall_grid = WallGrid(self.walls)
+        self.flow_field = FlowField(self.walls, self.width, self.height)
+        self.line_of_sight = LineOfSight(self.walls, self.width, self.height)
+        self.chunks = self.create_chunk_layer()
+        self.free_space = FreeSpaceMap(self.walls, (100, 100, self.width - 100, self.height - 100))
+        self.free_space.reserve(self.spawn_point[0], self.spawn_point[1], SPAWN_PLAYER_CLEARANCE)
+
+        # Gerar inimigos baseado nos pontos de legado (a mesma quantidade em cada bloco)
         base_enemies = 3 + (self.level_num // 3)
-        enemy_count = base_enemies + min(self.legacy_points // 15, 8)
+        enemy_count = (base_enemies + min(self.legacy_points // 15, 8)) * self.blocks[0] * self.blocks[1]
 
         enemy_types = ["guard"] * 5 + ["heavy"] * 2 + ["fast"] * 2 + ["sniper"]
 
         for _ in range(enemy_count):
             x, y = self.find_valid_position()
-            enemy_type = random.choice(enemy_types)
-            self.enemies.append(Enemy(x, y, enemy_type))
+            enemy_type = self.rng.choice(enemy_types)
+            self.enemies.append(Enemy(x, y, enemy_type, self.enemy_batch, self.rng))
 
         # Adicionar pickups de armas
         if self.level_num > 1:
@@ -1025,22 +2674,34 @@ class Level:
                 weapon_type = available_weapons.pop(0)
                 self.weapon_pickups.append((x, y, weapon_type))
 
-    def find_valid_position(self):
-        while True:
-            x = random.randint(100, SCREEN_WIDTH - 100)
-            y = random.randint(100, SCREEN_HEIGHT - 100)
-
-            # Verificar se a posição é válida
-            test_rect = pygame.Rect(x, y, TILE_SIZE - 20, TILE_SIZE - 20)
-            valid_position = True
-
-            for wall in self.walls:
-                if test_rect.colliderect(wall):
-                    valid_position = False
-                    break
-
-            if valid_position:
-                return x, y
+        if TRACER.enabled:
+            TRACER.complete("generate_level", start, category="level", walls=len(self.walls),
+                            enemies=len(self.enemies), pickups=len(self.weapon_pickups))
+
+    def simulated_slots(self, player_x, player_y):
+        """Slots de inimigos atualizados neste tick
+
+        Todos os que estão nos pedaços ativos (a tela em volta do jogador mais o anel
+        CHUNK_KEEP); os de fora se revezam, cada um a cada FAR_UPDATE_INTERVAL ticks.
+        """
+        self.ticks += 1
+        batch = self.enemy_batch
+        slots = np.flatnonzero(batch.active[:batch.count])
+        view = pygame.Rect(player_x - SCREEN_WIDTH // 2, player_y - SCREEN_HEIGHT // 2, SCREEN_WIDTH, SCREEN_HEIGHT)
+        columns, rows = self.chunks.chunk_range(view, CHUNK_KEEP)
+        x = batch.x[slots]
+        y = batch.y[slots]
+        near = ((x >= columns.start * CHUNK_SIZE) & (x < columns.stop * CHUNK_SIZE) &
+                (y >= rows.start * CHUNK_SIZE) & (y < rows.stop * CHUNK_SIZE))
+        turn = slots % FAR_UPDATE_INTERVAL == self.ticks % FAR_UPDATE_INTERVAL
+        return slots[near | turn]
+
+    def find_valid_position(self, spacing=SPAWN_SPACING):
+        # Sorteio O(1) no mapa de espaço livre; a área em volta fica reservada
+        x, y = self.free_space.sample(self.rng)
+        if spacing:
+            self.free_space.reserve(x, y, spacing)
+        return x, y
 
     def _generate_office_layout(self):
         # Layout de escritório com cubículos
@@ -1048,7 +2709,7 @@ class Level:
             for y in range(150, 550, 120):
                 self.walls.append(pygame.Rect(x, y, 100, 80))
                 # Adicionar mesas
-                if random.random() > 0.3:
+                if self.rng.random() > 0.3:
                     self.walls.append(pygame.Rect(x + 20, y + 60, 60, 20))
 
     def _generate_urban_layout(self):
@@ -1066,7 +2727,7 @@ class Level:
             # Adicionar janelas
             for i in range(1, (w // TILE_SIZE) - 1):
                 for j in range(1, (h // TILE_SIZE) - 1):
-                    if random.random() > 0.5:
+                    if self.rng.random() > 0.5:
                         self.walls.append(pygame.Rect(x + i * TILE_SIZE + 10, y + j * TILE_SIZE + 10,
                                                       TILE_SIZE - 20, TILE_SIZE - 20))
 
@@ -1082,7 +2743,7 @@ class Level:
         # Pista de dança
         for x in range(300, 600, 50):
             for y in range(250, 350, 50):
-                if random.random() > 0.7:
+                if self.rng.random() > 0.7:
                     self.walls.append(pygame.Rect(x, y, 30, 30))
 
     def _generate_warehouse_layout(self):
@@ -1105,8 +2766,8 @@ class Level:
                 for j in range(0, h, TILE_SIZE):
                     if i == 0 or i >= w - TILE_SIZE or j == 0 or j >= h - TILE_SIZE:
                         self.walls.append(pygame.Rect(x + i, y + j, TILE_SIZE, TILE_SIZE))
-            # Portas
-            door_pos = random.randint(1, (w // TILE_SIZE) - 2)
+            # Portas (casas de só dois tiles de largura têm a porta no segundo tile)
+            door_pos = self.rng.randint(1, max(1, (w // TILE_SIZE) - 2))
             self.walls.append(pygame.Rect(x + door_pos * TILE_SIZE, y + h - TILE_SIZE,
                                           TILE_SIZE, 20))
 
@@ -1128,14 +2789,312 @@ class Level:
         return exit_rect.colliderect(player_rect) and not [e for e in self.enemies if e.state == EnemyState.ALIVE]
 
 
-class Game:
+class LevelPrefetcher:
+    """Constrói o próximo nível numa thread enquanto resultado/diálogo estão na tela"""
+
     def __init__(self):
+        self.key = None
+        self.level = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.waits = 0  # Acertos em que a thread ainda estava construindo e foi preciso esperar
+        self.misses = 0
+        self.enabled = True  # Simulações em lote desligam: a partida acaba antes do próximo nível
+
+    def start(self, level_num, character_type, legacy_points, seed):
+        if not self.enabled:
+            return
+        key = (level_num, character_type, legacy_points, seed)
+        with self.lock:
+            if key == self.key:
+                return
+            self.key = key
+            self.level = None
+        self.thread = threading.Thread(target=self.build, args=(key,), daemon=True, name="prefetch")
+        self.thread.start()
+
+    def build(self, key):
+        level = Level(*key)
+        with self.lock:
+            # Descarta o resultado se outro pré-carregamento foi pedido nesse meio tempo
+            if self.key == key:
+                self.level = level
+
+    def take(self, level_num, character_type, legacy_points, seed):
+        key = (level_num, character_type, legacy_points, seed)
+        with self.lock:
+            pending = self.thread if self.key == key and self.level is None else None
+        if pending is not None and pending.is_alive():
+            # O mesmo nível ainda está sendo construído: esperar sai mais barato que construir outro igual
+            self.waits += 1
+            pending.join()
+
+        with self.lock:
+            level = self.level if self.key == key else None
+            self.key = None
+            self.level = None
+
+        if level is not None:
+            self.hits += 1
+            return level
+
+        # Nada pré-carregado (ou foi pedido outro nível, ou a thread falhou): constrói agora, mesma semente
+        self.misses += 1
+        return Level(*key)
+
+
+class FrameProfiler:
+    """Tempos por subsistema (ms) num buffer circular pré-alocado: uma linha por quadro"""
+
+    COLUMNS = ("frame", "ticks", "handle_events", "update", "enemies", "projectiles", "grenades", "particles",
+               "pickups", "draw", "draw_background", "draw_particles", "draw_entities", "draw_hud",
+               "n_enemies", "n_projectiles", "n_grenades", "n_particles")
+    SECTIONS = ("handle_events", "update", "enemies", "projectiles", "grenades", "particles", "pickups",
+                "draw", "draw_background", "draw_particles", "draw_entities", "draw_hud")
+    GRAPH_SIZE = (240, 60)
+    GRAPH_SCALE_MS = 33.3  # Altura total do gráfico
+    REFRESH_FRAMES = 15  # O painel é re-renderizado só a cada N quadros
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.column = {name: i for i, name in enumerate(self.COLUMNS)}
+        self.buffer = np.zeros((capacity, len(self.COLUMNS)))
+        self.index = 0  # Linha do quadro em andamento
+        self.filled = 0  # Quadros completos guardados (no máximo capacity - 1)
+        self.last_frame = time.perf_counter()
+        self.visible = False
+        self.panel = None
+        self.panel_age = 0
+
+    def add(self, name, value):
+        self.buffer[self.index, self.column[name]] += value
+
+    def lap(self, name, mark, **args):
+        # Soma o tempo desde `mark` na seção e devolve a nova marca; com o tracer ligado vira um span
+        now = time.perf_counter()
+        self.buffer[self.index, self.column[name]] += (now - mark) * 1000
+        if TRACER.enabled:
+            TRACER.complete(name, mark, now, **args)
+        return now
+
+    def end_frame(self, game):
+        now = time.perf_counter()
+        row = self.buffer[self.index]
+        row[self.column["frame"]] = (now - self.last_frame) * 1000
+        self.last_frame = now
+        if game.level:
+            row[self.column["n_enemies"]] = len(game.level.enemies)
+        row[self.column["n_projectiles"]] = len(game.projectiles)
+        row[self.column["n_grenades"]] = len(game.grenades)
+        row[self.column["n_particles"]] = len(game.blood_particles)
+
+        self.index = (self.index + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity - 1)
+        self.buffer[self.index] = 0
+
+    def ordered(self):
+        # Quadros completos, do mais antigo para o mais recente
+        rows = (self.index - self.filled + np.arange(self.filled)) % self.capacity
+        return self.buffer[rows]
+
+    def percentiles(self, name, rows=None):
+        rows = self.ordered() if rows is None else rows
+        if not len(rows):
+            return 0.0, 0.0, 0.0
+        return tuple(np.percentile(rows[:, self.column[name]], (50, 95, 99)).tolist())
+
+    def dump_csv(self, path=None):
+        path = path or time.strftime("perfil_%Y%m%d_%H%M%S.csv")
+        np.savetxt(path, self.ordered(), delimiter=",", fmt="%.4f", header=",".join(self.COLUMNS), comments="")
+        return path
+
+    def render_panel(self, font):
+        rows = self.ordered()
+        width, height = self.GRAPH_SIZE
+        line_height = font.get_linesize()
+        panel = pygame.Surface((width + 20, height + 30 + line_height * (len(self.SECTIONS) + 3)), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 190))
+
+        # Gráfico dos últimos quadros, com a linha de referência de 60 FPS
+        frames = rows[-width:, self.column["frame"]]
+        graph_top = 10
+        for x, frame_ms in enumerate(frames.tolist()):
+            bar = min(height, int(frame_ms / self.GRAPH_SCALE_MS * height))
+            color = GREEN if frame_ms <= 1000 / FPS else YELLOW if frame_ms <= 2000 / FPS else RED
+            pygame.draw.line(panel, color, (10 + x, graph_top + height), (10 + x, graph_top + height - bar))
+        target_y = graph_top + height - int(1000 / FPS / self.GRAPH_SCALE_MS * height)
+        pygame.draw.line(panel, LIGHT_GRAY, (10, target_y), (10 + width, target_y))
+
+        p50, p95, p99 = self.percentiles("frame", rows)
+        lines = [(f"QUADRO p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f} ms", WHITE)]
+        means = rows.mean(axis=0) if len(rows) else np.zeros(len(self.COLUMNS))
+        for name in self.SECTIONS:
+            color = LIGHT_GRAY if name.startswith("draw_") or name in ("enemies", "projectiles", "grenades",
+                                                                        "particles", "pickups") else YELLOW
+            lines.append((f"{name:<16} {means[self.column[name]]:6.3f} ms", color))
+        counts = (f"INIMIGOS {means[self.column['n_enemies']]:.0f}  PROJ {means[self.column['n_projectiles']]:.0f}  "
+                  f"GRAN {means[self.column['n_grenades']]:.0f}  PART {means[self.column['n_particles']]:.0f}")
+        lines.append((counts, WHITE))
+        lines.append(("F3: FECHAR  F4: SALVAR CSV", LIGHT_GRAY))
+
+        for i, (text, color) in enumerate(lines):
+            panel.blit(font.render(text, True, color), (10, graph_top + height + 10 + i * line_height))
+        return panel
+
+    def draw(self, screen, font):
+        self.panel_age -= 1
+        if self.panel is None or self.panel_age <= 0:
+            self.panel = self.render_panel(font)
+            self.panel_age = self.REFRESH_FRAMES
+        return screen.blit(self.panel, (SCREEN_WIDTH - self.panel.get_width() - 10, SCREEN_HEIGHT - self.panel.get_height() - 10))
+
+
+class HUD:
+    """HUD incremental: cada campo só é renderizado de novo quando seu valor muda"""
+
+    # Legenda de controles, renderizada uma única vez por sessão
+    CONTROLS = [
+        "WASD: MOVER",
+        "MOUSE ESQ: ATACAR",
+        "MOUSE DIR: EXECUTAR",
+        "E: HABILIDADE",
+        "Q/F: TROCAR ARMA",
+        "R: RECARREGAR",
+        "F3/F4: PERFIL"
+    ]
+    legend = None
+
+    def __init__(self, font, small_font):
+        self.font = font
+        self.small_font = small_font
+        self.fields = {}
+        self.layer = pygame.Surface((420, 300), pygame.SRCALPHA)
+        self.layer_key = None
+        self.message_key = None
+        self.message_surface = None
+        self.renders = 0
+
+        if HUD.legend is None:
+            HUD.legend = pygame.Surface((180, len(self.CONTROLS) * 25), pygame.SRCALPHA)
+            for i, control in enumerate(self.CONTROLS):
+                HUD.legend.blit(small_font.render(control, True, LIGHT_GRAY), (0, i * 25))
+
+    def field(self, name, text, color):
+        cached = self.fields.get(name)
+        if cached is not None and cached[0] == (text, color):
+            return cached[1]
+        surface = self.small_font.render(text, True, color)
+        self.renders += 1
+        self.fields[name] = ((text, color), surface)
+        return surface
+
+    def update(self, game):
+        player = game.player
+
+        # Estado do jogador
+        state_text = "NORMAL"
+        state_color = GREEN
+        if player.state == PlayerState.DOWNED:
+            state_text = f"CAÍDO - {player.downed_timer // 60 + 1}s"
+            state_color = RED
+
+        # Arma atual
+        current_weapon = player.weapons[player.current_weapon_index]
+        if current_weapon.is_ranged:
+            ammo_text = f"MUNIÇÃO: {current_weapon.ammo}/{current_weapon.max_ammo}"
+        else:
+            ammo_text = "ARMA BRANCA"
+
+        char_color = (BLUE if player.character_type == CharacterType.VETERAN else
+                      GREEN if player.character_type == CharacterType.INVESTIGATOR else
+                      RED if player.character_type == CharacterType.SUCCESSOR else
+                      PURPLE if player.character_type == CharacterType.EXECUTIONER else
+                      ORANGE)
+
+        # Habilidade
+        ability_text = "PRONTO"
+        ability_color = GREEN
+        if player.ability_cooldown > 0:
+            ability_text = f"RECARREGANDO: {player.ability_cooldown // 60 + 1}s"
+            ability_color = YELLOW
+
+        rows = [
+            self.field("health", f"SAÚDE: {player.health}/{player.max_health}", WHITE),
+            self.field("state", f"ESTADO: {state_text}", state_color),
+            self.field("weapon", f"ARMA: {current_weapon.weapon_type.name}", WHITE),
+            self.field("ammo", ammo_text, YELLOW),
+            self.field("score", f"SCORE: {player.score}", WHITE),
+            self.field("combo", f"COMBO: x{player.combo}", YELLOW),
+            self.field("level", f"NÍVEL: {game.level_num}/29", WHITE),
+            self.field("character", f"PERSONAGEM: {player.character_type.name}", char_color),
+            self.field("ability", f"HABILIDADE (E): {ability_text}", ability_color),
+            self.field("legacy", f"PONTOS DE LEGADO: {player.legacy_points}", PURPLE),
+        ]
+
+        # A camada só é recomposta quando algum campo (ou a barra de saúde) muda
+        layer_key = (player.health, player.max_health, self.renders)
+        if layer_key == self.layer_key:
+            return
+        self.layer_key = layer_key
+        self.layer.fill((0, 0, 0, 0))
+
+        # Barra de saúde
+        health_width = 200
+        health_height = 20
+        health_x = 20
+        health_y = 20
+
+        pygame.draw.rect(self.layer, DARK_GRAY, (health_x, health_y, health_width, health_height))
+        if player.max_health > 0:
+            current_health_width = (player.health / player.max_health) * health_width
+        else:
+            current_health_width = 0
+
+        health_color = GREEN if player.health > player.max_health * 0.6 else YELLOW if player.health > player.max_health * 0.3 else RED
+        pygame.draw.rect(self.layer, health_color, (health_x, health_y, current_health_width, health_height))
+
+        for i, row in enumerate(rows):
+            self.layer.blit(row, (health_x, health_y + 25 + i * 25))
+
+    def draw(self, screen, game):
+        screen.blit(self.layer, (0, 0))
+        screen.blit(HUD.legend, (SCREEN_WIDTH - 180, 20))
+
+        # Mensagem de habilidade
+        if game.message_timer > 0:
+            if self.message_key != game.message:
+                self.message_key = game.message
+                self.message_surface = self.font.render(game.message, True, YELLOW)
+            screen.blit(self.message_surface, (SCREEN_WIDTH // 2 - self.message_surface.get_width() // 2, 50))
+
+
+class Game:
+    def __init__(self, input_source=None, seed=None):
+        # Toda a aleatoriedade da partida sai desta semente (gravada nos replays)
+        self.seed = random.getrandbits(32) if seed is None else seed
+        random.seed(self.seed)
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Hotline Miami 3: Aftermath")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont('Arial', 24)
         self.small_font = pygame.font.SysFont('Arial', 18)
         self.title_font = pygame.font.SysFont('Arial', 48, bold=True)
+        self.input = input_source or PygameInput()
+        self.hud = HUD(self.font, self.small_font)
+
+        # Telas paradas (menu, resultado, diálogos) são compostas uma vez nesta camada; enquanto
+        # a chave não muda, o quadro só reapresenta o que mudou por cima (painel do perfil)
+        self.static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.static_key = None
+        self.overlay_rect = None
+        self.shade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.shade.fill((0, 0, 0, 200))
+        self.menu_lines = None
+        self.result_key = None
+        self.result_lines = []
+        self.player_camera = (0, 0)  # Câmera com que o jogador foi desenhado no último quadro
+        self.crawl_center = None  # Rastejar animado sobre a tela de resultado (None = sem animação)
 
         self.state = GameState.MENU
         self.player = None
@@ -1144,17 +3103,25 @@ class Game:
         self.total_levels = 29  # 25 + 4 extras
         self.camera_x = 0
         self.camera_y = 0
-        self.blood_particles = []
+        self.prev_camera = (0, 0)
+        self.blood_particles = ParticleSystem()
         self.message = ""
         self.message_timer = 0
-        self.projectiles = []
-        self.grenades = []
+        self.projectiles = PROJECTILE_POOL
+        self.grenades = GRENADE_POOL
         self.dialog_system = DialogSystem()
+        self.cull_stats = {}
+        self.prefetcher = LevelPrefetcher()
+        self.next_level_seed = None
 
         # Efeitos
         self.slow_motion = False
-        self.normal_fps = FPS
-        self.slow_fps = FPS // 3
+        self.render_fps = MAX_RENDER_FPS
+
+        # Custo do último tick e do último quadro, medidos separadamente (ms)
+        self.tick_ms = 0.0
+        self.frame_ms = 0.0
+        self.profiler = FrameProfiler()
 
         # Progressão por personagem (5 níveis cada + 4 extras)
         self.character_progression = {
@@ -1166,17 +3133,117 @@ class Game:
             "FINAL": list(range(25, 30))
         }
 
-    def get_current_character(self):
+    def snapshot(self):
+        """Estado completo da simulação em tipos JSON (usado nos keyframes de replay)"""
+        return {
+            "seed": self.seed,
+            "random": rng_state(random),
+            "state": self.state.name,
+            "level_num": self.level_num,
+            "camera": [self.camera_x, self.camera_y],
+            "message": self.message,
+            "message_timer": self.message_timer,
+            "slow_motion": self.slow_motion,
+            "next_level_seed": self.next_level_seed,
+            "level": self.level.snapshot() if self.level else None,
+            "player": self.player.snapshot(self.level.enemies if self.level else []) if self.player else None,
+            "projectiles": [projectile.snapshot() for projectile in self.projectiles],
+            "grenades": [grenade.snapshot() for grenade in self.grenades],
+            "particles": self.blood_particles.snapshot(),
+            "dialog": self.dialog_system.snapshot(),
+        }
+
+    def restore(self, data):
+        self.level = Level.from_snapshot(data["level"]) if data["level"] else None
+        enemies = self.level.enemies if self.level else []
+        self.player = Player.from_snapshot(data["player"], enemies) if data["player"] else None
+
+        # Pools na mesma ordem do snapshot: a ordem de atualização faz parte do estado
+        self.projectiles.clear()
+        for entry in data["projectiles"]:
+            self.projectiles.acquire(0, 0, 0, 0, 0, 0, None).restore(entry)
+        self.grenades.clear()
+        for entry in data["grenades"]:
+            self.grenades.acquire(0, 0, 0, 0).restore(entry)
+        self.blood_particles.restore(data["particles"])
+        self.dialog_system.restore(data["dialog"])
+
+        self.seed = data["seed"]
+        self.state = GameState[data["state"]]
+        self.level_num = data["level_num"]
+        self.camera_x, self.camera_y = data["camera"]
+        self.message = data["message"]
+        self.message_timer = data["message_timer"]
+        self.slow_motion = data["slow_motion"]
+        self.next_level_seed = data["next_level_seed"]
+        set_rng_state(random, data["random"])
+        self.store_previous()
+        self.static_key = None
+
+    @property
+    def time_scale(self):
+        # A lentidão só desacelera o tempo de jogo; entrada e desenho seguem na taxa do monitor
+        return SLOW_MOTION_SCALE if self.slow_motion else 1.0
+
+    def store_previous(self):
+        # Posições do tick anterior, para interpolar o desenho entre dois passos
+        self.prev_camera = (self.camera_x, self.camera_y)
+        if self.player:
+            self.player.prev_x, self.player.prev_y = self.player.x, self.player.y
+        if self.level:
+            self.level.enemy_batch.store_previous()
+        for pool in (self.projectiles, self.grenades):
+            for entity in pool:
+                entity.prev_x, entity.prev_y = entity.x, entity.y
+
+    def tick(self):
+        """Um passo fixo da simulação (entrada + atualização)"""
+        start = time.perf_counter()
+        level = self.level
+        self.store_previous()
+        mark = time.perf_counter()
+        running = self.handle_events()
+        mark = self.profiler.lap("handle_events", mark)
+        self.update()
+        self.profiler.lap("update", mark, state=self.state.name)
+        if self.level is not level:
+            # Nível novo é um teletransporte: não há movimento para interpolar
+            self.store_previous()
+        self.tick_ms = (time.perf_counter() - start) * 1000
+        self.profiler.add("ticks", 1)
+        if TRACER.enabled:
+            TRACER.complete("tick", start, category="tick")
+        return running
+
+    def get_current_character(self, level_num=None):
+        level_num = self.level_num if level_num is None else level_num
         for char_type, levels in self.character_progression.items():
-            if self.level_num in levels:
+            if level_num in levels:
                 return char_type
         return CharacterType.VETERAN
 
+    def prefetch_next_level(self):
+        if self.level_num >= self.total_levels:
+            return
+        # A semente é sorteada aqui, na thread principal, para o jogo continuar reproduzível
+        if self.next_level_seed is None:
+            self.next_level_seed = random.getrandbits(32)
+        self.prefetcher.start(self.level_num + 1, self.get_current_character(self.level_num + 1),
+                              self.player.legacy_points, self.next_level_seed)
+
     def handle_events(self):
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == pygame.QUIT:
                 return False
 
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_F3, pygame.K_F4):
+                # Perfilador: F3 mostra/esconde o painel, F4 salva o buffer em CSV
+                if event.key == pygame.K_F3:
+                    self.profiler.visible = not self.profiler.visible
+                else:
+                    self.show_message(f"PERFIL SALVO: {self.profiler.dump_csv()}")
+                continue
+
             if event.type == pygame.KEYDOWN:
                 if self.state == GameState.MENU:
                     if event.key == pygame.K_1:
@@ -1201,13 +3268,12 @@ class Game:
 
                 elif self.state == GameState.PLAYING:
                     if event.key == pygame.K_e:
-                        ability_result = self.player.use_ability(self.level.enemies)
+                        ability_result = self.player.use_ability(self.level.enemies, self.level.enemy_grid)
+                        # Granadas já entram ativas no pool ao serem criadas
                         if isinstance(ability_result, str):
                             self.show_message(ability_result)
                             if self.player.mask_ability == "slow_time":
                                 self.slow_motion = True
-                        elif isinstance(ability_result, Grenade):
-                            self.grenades.append(ability_result)
                     elif event.key == pygame.K_q:
                         self.player.switch_weapon(-1)  # Arma anterior
                     elif event.key == pygame.K_f:
@@ -1231,18 +3297,17 @@ class Game:
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if self.state == GameState.PLAYING:
                     if event.button == 1:  # Mouse esquerdo - Atacar
-                        projectile = self.player.attack(self.level.enemies)
-                        if projectile:
-                            self.projectiles.append(projectile)
+                        # Projéteis já entram ativos no pool ao serem criados
+                        self.player.attack(self.level.enemy_grid)
                     elif event.button == 3:  # Mouse direito - Executar inimigos caídos
-                        if self.player.execute_enemy(self.level.enemies):
+                        if self.player.execute_enemy(self.level.enemy_grid):
                             self.show_message("EXECUTADO!")
 
         return True
 
     def update(self):
         if self.state == GameState.PLAYING:
-            keys = pygame.key.get_pressed()
+            keys = self.input.get_pressed()
 
             # Movimento do jogador
             dx, dy = 0, 0
@@ -1260,47 +3325,45 @@ class Game:
                 dx *= 0.7071
                 dy *= 0.7071
 
-            self.player.move(dx, dy, self.level.walls)
+            self.player.move(dx, dy, self.level.wall_grid)
             self.player.update()
 
-            # Atualizar inimigos
-            for enemy in self.level.enemies[:]:
-                enemy_projectile = enemy.update(self.player, self.level.walls, self.projectiles)
-                if enemy_projectile:
-                    self.projectiles.append(enemy_projectile)
-
-                if enemy.state == EnemyState.DEAD:
-                    self.level.enemies.remove(enemy)
+            # Atualizar inimigos (IA de todos em uma passada vetorizada)
+            profiler = self.profiler
+            mark = time.perf_counter()
+            slots = self.level.simulated_slots(self.player.x, self.player.y)
+            self.level.enemy_batch.update(self.player, self.level.wall_grid, slots, flow_field=self.level.flow_field,
+                                          sight=self.level.line_of_sight)
+
+            dead_enemies = [enemy for enemy in self.level.enemies if enemy.state == EnemyState.DEAD]
+            if dead_enemies:
+                self.level.enemies = [enemy for enemy in self.level.enemies if enemy.state != EnemyState.DEAD]
+                for enemy in dead_enemies:
+                    self.level.enemy_batch.remove(enemy)
                     # Partículas de sangue
-                    for _ in range(20):
-                        self.blood_particles.append([
-                            enemy.x + TILE_SIZE // 2,
-                            enemy.y + TILE_SIZE // 2,
-                            random.uniform(-8, 8),
-                            random.uniform(-8, 8),
-                            random.randint(30, 60)
-                        ])
-
-            # Atualizar projéteis
-            for projectile in self.projectiles[:]:
-                result = projectile.update(self.level.walls, self.level.enemies)
+                    self.blood_particles.spawn(enemy.x + TILE_SIZE // 2, enemy.y + TILE_SIZE // 2, 20)
+            mark = profiler.lap("enemies", mark, count=len(self.level.enemies), simulated=len(slots),
+                                killed=len(dead_enemies))
+
+            # Atualizar projéteis (de trás para frente: a liberação troca com o último)
+            for index in range(len(self.projectiles) - 1, -1, -1):
+                projectile = self.projectiles[index]
+                result = projectile.update(self.level.wall_grid, self.level.enemy_grid)
                 if result == "wall" or isinstance(result, Enemy) or not projectile.active:
-                    self.projectiles.remove(projectile)
+                    self.projectiles.release(projectile)
+            mark = profiler.lap("projectiles", mark, count=len(self.projectiles))
 
             # Atualizar granadas
-            for grenade in self.grenades[:]:
-                if grenade.update(self.level.walls, self.level.enemies):
-                    self.grenades.remove(grenade)
+            for index in range(len(self.grenades) - 1, -1, -1):
+                grenade = self.grenades[index]
+                if grenade.update(self.level.wall_grid, self.level.enemy_grid):
+                    self.grenades.release(grenade)
                     self.show_message("GRANADA DETONADA!")
+            mark = profiler.lap("grenades", mark, count=len(self.grenades))
 
-            # Atualizar partículas de sangue
-            for particle in self.blood_particles[:]:
-                particle[0] += particle[2]
-                particle[1] += particle[3]
-                particle[4] -= 1
-
-                if particle[4] <= 0:
-                    self.blood_particles.remove(particle)
+            # Atualizar partículas de sangue (passo vetorizado)
+            self.blood_particles.update()
+            mark = profiler.lap("particles", mark, count=len(self.blood_particles))
 
             # Verificar pickups de armas
             for pickup in self.level.weapon_pickups[:]:
@@ -1314,10 +3377,12 @@ class Game:
                         self.show_message("NOVA ARMA ADQUIRIDA!")
                     else:
                         self.show_message("MUNIÇÃO RECARREGADA")
+            profiler.lap("pickups", mark, count=len(self.level.weapon_pickups))
 
             # Verificar se o nível foi completado
             if self.level.is_complete(self.player):
                 self.state = GameState.LEVEL_COMPLETE
+                self.prefetch_next_level()
                 # Dialogo ao completar nível
                 dialog_key = (self.level_num - 1) % 3 + 1 + (self.level_num - 1) // 5 * 3
                 if self.dialog_system.start_dialog(dialog_key):
@@ -1345,239 +3410,273 @@ class Game:
             if not self.dialog_system.current_dialog:
                 self.state = GameState.PLAYING
 
-    def draw(self):
-        self.screen.fill(BLACK)
+    def draw(self, alpha=1.0):
+        # alpha: fração do tick seguinte já decorrida (0 = posição anterior, 1 = atual)
+        start = time.perf_counter()
+        key = self.static_screen_key()
+        if key is None:
+            # Em jogo tudo se move: quadro inteiro, todo quadro
+            self.static_key = None
+            self.screen.fill(BLACK)
+            self.draw_game(alpha)
+            dirty = None
+        elif key != self.static_key:
+            self.static_key = key
+            self.compose_static()
+            dirty = None
+        else:
+            # Tela parada já apresentada: só a região sob o painel do quadro anterior e o
+            # rastejar (rastro antigo e posição nova) são refeitos a partir da camada
+            dirty = []
+            if self.overlay_rect:
+                dirty.append(self.repaint(self.overlay_rect))
+            if self.crawl_center:
+                previous = self.crawl_rect()
+                self.crawl_center = self.player.crawl_position(*self.player_camera)
+                if self.crawl_rect() != previous:
+                    dirty.append(self.repaint(previous.union(self.crawl_rect())))
+
+        self.overlay_rect = None
+        if self.profiler.visible:
+            self.overlay_rect = self.profiler.draw(self.screen, self.small_font)
+            if dirty is not None:
+                dirty.append(self.overlay_rect)
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+        self.frame_ms = (time.perf_counter() - start) * 1000
+        self.profiler.lap("draw", start, state=self.state.name)
+
+    def static_screen_key(self):
+        """Tudo o que define o desenho de uma tela parada, ou None durante o jogo"""
+        if self.state == GameState.MENU:
+            return (self.state,)
+        if self.state in (GameState.GAME_OVER, GameState.LEVEL_COMPLETE):
+            # A simulação não anda nessas telas; o nível e seus ticks identificam a cena por baixo
+            return self.state, self.level, self.level.ticks, self.level_num, self.player.score
+        if self.state in (GameState.DIALOG, GameState.CUTSCENE):
+            return self.state, self.dialog_system.visible_line()
+        return None
 
+    def compose_static(self):
+        self.screen.fill(BLACK)
+        self.crawl_center = None
+        if self.state in (GameState.GAME_OVER, GameState.LEVEL_COMPLETE):
+            # Camada = cena sem o rastejar; o rastejar, a sombra e os textos vão por cima (repaint)
+            self.draw_game(crawl=False)
+            self.static_layer.blit(self.screen, (0, 0))
+            if self.player.state == PlayerState.DOWNED:
+                self.crawl_center = self.player.crawl_position(*self.player_camera)
+            self.draw_results()
+            return
         if self.state == GameState.MENU:
             self.draw_menu()
-        elif self.state == GameState.PLAYING:
-            self.draw_game()
-        elif self.state == GameState.GAME_OVER:
-            self.draw_game()
-            self.draw_game_over()
-        elif self.state == GameState.LEVEL_COMPLETE:
-            self.draw_game()
-            self.draw_level_complete()
         elif self.state in [GameState.DIALOG, GameState.CUTSCENE]:
             self.dialog_system.draw(self.screen)
+        self.static_layer.blit(self.screen, (0, 0))
 
-        pygame.display.flip()
+    def draw_results(self):
+        if self.crawl_center:
+            pygame.draw.circle(self.screen, RED, self.crawl_center, 3)
+        if self.state == GameState.GAME_OVER:
+            self.draw_game_over()
+        else:
+            self.draw_level_complete()
+
+    def crawl_rect(self):
+        # Cobre o círculo de raio 3 com folga de um pixel
+        return pygame.Rect(self.crawl_center[0] - 4, self.crawl_center[1] - 4, 9, 9)
+
+    def repaint(self, area):
+        """Refaz uma área da tela parada na mesma ordem da composição e devolve a área"""
+        if self.state in (GameState.GAME_OVER, GameState.LEVEL_COMPLETE):
+            self.screen.set_clip(area)
+            self.screen.blit(self.static_layer, (0, 0))
+            self.draw_results()
+            self.screen.set_clip(None)
+        else:
+            self.screen.blit(self.static_layer, area, area)
+        return area
 
     def draw_menu(self):
-        # Título
-        title = self.title_font.render("HOTLINE MIAMI 3: AFTERMATH", True, RED)
-        subtitle = self.font.render("29 FATES, 5 KILLERS, 1 TRUTH", True, WHITE)
-
-        # Personagens
-        veteran = self.font.render("1 - VETERANO (Lentidão Temporal)", True, BLUE)
-        investigator = self.font.render("2 - INVESTIGADORA (Marcar Inimigos)", True, GREEN)
-        successor = self.font.render("3 - SUCESSOR (Modo Berserk)", True, RED)
-        executioner = self.font.render("4 - EXECUTIONER (Execução)", True, PURPLE)
-        soldier = self.font.render("5 - SOLDIER (Granadas) - NOVO!", True, ORANGE)
-
-        hint = self.small_font.render("Pressione 1-5 para selecionar o personagem", True, YELLOW)
-        story = self.small_font.render("29 níveis: 25 principais + 4 bônus do Soldier", True, LIGHT_GRAY)
-        controls = self.small_font.render("Mouse Esq: ATACAR | Mouse Dir: EXECUTAR | E: HABILIDADE", True, YELLOW)
-
-        self.screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 80))
-        self.screen.blit(subtitle, (SCREEN_WIDTH // 2 - subtitle.get_width() // 2, 150))
-        self.screen.blit(veteran, (SCREEN_WIDTH // 2 - veteran.get_width() // 2, 230))
-        self.screen.blit(investigator, (SCREEN_WIDTH // 2 - investigator.get_width() // 2, 280))
-        self.screen.blit(successor, (SCREEN_WIDTH // 2 - successor.get_width() // 2, 330))
-        self.screen.blit(executioner, (SCREEN_WIDTH // 2 - executioner.get_width() // 2, 380))
-        self.screen.blit(soldier, (SCREEN_WIDTH // 2 - soldier.get_width() // 2, 430))
-        self.screen.blit(story, (SCREEN_WIDTH // 2 - story.get_width() // 2, 500))
-        self.screen.blit(controls, (SCREEN_WIDTH // 2 - controls.get_width() // 2, 530))
-        self.screen.blit(hint, (SCREEN_WIDTH // 2 - hint.get_width() // 2, 580))
-
-    def draw_game(self):
-        # Desenhar fundo
-        self.screen.blit(self.level.background_texture, (0, 0))
-
-        # Desenhar nível com texturas
-        for i, wall in enumerate(self.level.walls):
-            texture_index = i % len(self.level.wall_textures)
-            wall_texture = self.level.wall_textures[texture_index]
-            self.screen.blit(wall_texture, (wall.x - self.camera_x, wall.y - self.camera_y))
+        # Textos fixos: renderizados uma única vez por sessão
+        if self.menu_lines is None:
+            self.menu_lines = [
+                # Título
+                (self.title_font.render("HOTLINE MIAMI 3: AFTERMATH", True, RED), 80),
+                (self.font.render("29 FATES, 5 KILLERS, 1 TRUTH", True, WHITE), 150),
+
+                # Personagens
+                (self.font.render("1 - VETERANO (Lentidão Temporal)", True, BLUE), 230),
+                (self.font.render("2 - INVESTIGADORA (Marcar Inimigos)", True, GREEN), 280),
+                (self.font.render("3 - SUCESSOR (Modo Berserk)", True, RED), 330),
+                (self.font.render("4 - EXECUTIONER (Execução)", True, PURPLE), 380),
+                (self.font.render("5 - SOLDIER (Granadas) - NOVO!", True, ORANGE), 430),
+
+                (self.small_font.render("29 níveis: 25 principais + 4 bônus do Soldier", True, LIGHT_GRAY), 500),
+                (self.small_font.render("Mouse Esq: ATACAR | Mouse Dir: EXECUTAR | E: HABILIDADE", True, YELLOW),
+                 530),
+                (self.small_font.render("Pressione 1-5 para selecionar o personagem", True, YELLOW), 580),
+            ]
+
+        for surface, y in self.menu_lines:
+            self.screen.blit(surface, (SCREEN_WIDTH // 2 - surface.get_width() // 2, y))
+
+    def draw_game(self, alpha=1.0, crawl=True):
+        start = time.perf_counter()
+        prev_x, prev_y = self.prev_camera
+        camera_x = prev_x + (self.camera_x - prev_x) * alpha
+        camera_y = prev_y + (self.camera_y - prev_y) * alpha
+
+        # Desenhar fundo e paredes (pedaços pré-renderizados em volta da câmera)
+        self.level.chunks.draw(self.screen, camera_x, camera_y)
 
         # Desenhar saída
-        exit_rect = pygame.Rect(self.level.exit_point[0] - self.camera_x,
-                                self.level.exit_point[1] - self.camera_y,
+        exit_rect = pygame.Rect(self.level.exit_point[0] - camera_x,
+                                self.level.exit_point[1] - camera_y,
                                 TILE_SIZE, TILE_SIZE)
         pygame.draw.rect(self.screen, GREEN, exit_rect)
         exit_text = self.small_font.render("SAÍDA", True, BLACK)
         self.screen.blit(exit_text, (exit_rect.x + 10, exit_rect.y + 20))
+        profiler = self.profiler
+        mark = profiler.lap("draw_background", start)
+
+        # Só o que está dentro da câmera (com folga) é desenhado
+        view = self.camera_view()
 
         # Desenhar pickups de armas
-        for x, y, weapon_type in self.level.weapon_pickups:
-            pickup_rect = pygame.Rect(x - self.camera_x, y - self.camera_y, TILE_SIZE - 20, TILE_SIZE - 20)
+        for x, y, weapon_type in self.cull("pickups", self.level.weapon_pickups, view):
+            pickup_rect = pygame.Rect(x - camera_x, y - camera_y, TILE_SIZE - 20, TILE_SIZE - 20)
             color = ORANGE if weapon_type.value >= 4 else YELLOW
             pygame.draw.rect(self.screen, color, pickup_rect)
             pygame.draw.rect(self.screen, BLACK, pickup_rect, 2)
             weapon_name = self.small_font.render(weapon_type.name[:3], True, BLACK)
             self.screen.blit(weapon_name, (pickup_rect.x + 5, pickup_rect.y + 15))
 
+        mark = profiler.lap("draw_entities", mark)
+
         # Desenhar partículas de sangue
-        for particle in self.blood_particles:
-            size = max(2, particle[4] // 8)
-            alpha = min(255, particle[4] * 4)
-            blood_color = (BLOOD_RED[0], BLOOD_RED[1], BLOOD_RED[2], alpha)
-            blood_surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-            pygame.draw.circle(blood_surface, blood_color, (size, size), size)
-            self.screen.blit(blood_surface,
-                             (particle[0] - self.camera_x - size,
-                              particle[1] - self.camera_y - size))
+        particles = self.blood_particles
+        n = particles.count
+        xs, ys = particles.x[:n], particles.y[:n]
+        visible = np.flatnonzero((xs >= view.left) & (xs < view.right) & (ys >= view.top) & (ys < view.bottom))
+        self.cull_stats["particles"] = (visible.size, n - visible.size)
+        # Posição anterior da partícula é x - vx (integração explícita); tamanho, opacidade e
+        # posição na tela saem dos arrays de uma vez, o laço só escolhe o sprite
+        back = 1.0 - alpha
+        life = particles.life[visible].astype(np.int64)
+        sizes = np.maximum(2, life // 8)
+        opacities = np.minimum(255, life * 4)
+        # (arrays float32: a câmera é descontada já em float64, como antes)
+        left = (xs[visible] - particles.vx[visible] * back).astype(np.float64) - camera_x - sizes
+        top = (ys[visible] - particles.vy[visible] * back).astype(np.float64) - camera_y - sizes
+        self.screen.blits([(SPRITE_CACHE.circle(BLOOD_RED, size, opacity), (px, py))
+                           for size, opacity, px, py in zip(sizes.tolist(), opacities.tolist(),
+                                                            left.tolist(), top.tolist())], False)
+        mark = profiler.lap("draw_particles", mark)
 
         # Desenhar projéteis
-        for projectile in self.projectiles:
-            projectile.draw(self.screen, self.camera_x, self.camera_y)
+        for projectile in self.cull("projectiles", self.projectiles, view):
+            projectile.draw(self.screen, *self.lerp_camera(projectile, camera_x, camera_y, alpha))
 
         # Desenhar granadas
-        for grenade in self.grenades:
-            grenade.draw(self.screen, self.camera_x, self.camera_y)
+        for grenade in self.cull("grenades", self.grenades, view):
+            grenade.draw(self.screen, *self.lerp_camera(grenade, camera_x, camera_y, alpha))
 
         # Desenhar inimigos
-        for enemy in self.level.enemies:
+        for enemy in self.cull_enemies(view):
             is_marked = (self.player.marked_enemy == enemy)
-            enemy.draw(self.screen, self.camera_x, self.camera_y, is_marked)
+            enemy.draw(self.screen, *self.lerp_camera(enemy, camera_x, camera_y, alpha), is_marked)
 
         # Desenhar jogador
-        self.player.draw(self.screen, self.camera_x, self.camera_y)
+        self.player_camera = self.lerp_camera(self.player, camera_x, camera_y, alpha)
+        self.player.draw(self.screen, *self.player_camera, crawl)
+        mark = profiler.lap("draw_entities", mark)
 
         # Desenhar HUD
         self.draw_hud()
-
-    def draw_hud(self):
-        # Barra de saúde
-        health_width = 200
-        health_height = 20
-        health_x = 20
-        health_y = 20
-
-        pygame.draw.rect(self.screen, DARK_GRAY, (health_x, health_y, health_width, health_height))
-        if self.player.max_health > 0:
-            current_health_width = (self.player.health / self.player.max_health) * health_width
+        profiler.lap("draw_hud", mark)
+
+    @staticmethod
+    def lerp_camera(entity, camera_x, camera_y, alpha):
+        # Recuar a câmera pelo resto do movimento desenha a entidade na posição interpolada
+        back = 1.0 - alpha
+        return camera_x + (entity.x - entity.prev_x) * back, camera_y + (entity.y - entity.prev_y) * back
+
+    def camera_view(self):
+        return pygame.Rect(self.camera_x - CULL_MARGIN, self.camera_y - CULL_MARGIN,
+                           SCREEN_WIDTH + CULL_MARGIN * 2, SCREEN_HEIGHT + CULL_MARGIN * 2)
+
+    def cull(self, kind, entities, view):
+        # Posições num array e um único teste vetorizado contra a área da câmera;
+        # guarda quantos foram desenhados e descartados
+        count = len(entities)
+        if kind == "pickups":
+            xs = np.fromiter((pickup[0] for pickup in entities), float, count)
+            ys = np.fromiter((pickup[1] for pickup in entities), float, count)
         else:
-            current_health_width = 0
-
-        health_color = GREEN if self.player.health > self.player.max_health * 0.6 else YELLOW if self.player.health > self.player.max_health * 0.3 else RED
-        pygame.draw.rect(self.screen, health_color, (health_x, health_y, current_health_width, health_height))
-
-        health_text = self.small_font.render(f"SAÚDE: {self.player.health}/{self.player.max_health}", True, WHITE)
-        self.screen.blit(health_text, (health_x, health_y + 25))
-
-        # Estado do jogador
-        state_text = "NORMAL"
-        state_color = GREEN
-        if self.player.state == PlayerState.DOWNED:
-            state_text = f"CAÍDO - {self.player.downed_timer // 60 + 1}s"
-            state_color = RED
-        state_surface = self.small_font.render(f"ESTADO: {state_text}", True, state_color)
-        self.screen.blit(state_surface, (health_x, health_y + 50))
-
-        # Arma atual
-        current_weapon = self.player.weapons[self.player.current_weapon_index]
-        weapon_text = self.small_font.render(f"ARMA: {current_weapon.weapon_type.name}", True, WHITE)
-        ammo_text = ""
-        if current_weapon.is_ranged:
-            ammo_text = self.small_font.render(f"MUNIÇÃO: {current_weapon.ammo}/{current_weapon.max_ammo}", True,
-                                               YELLOW)
-        else:
-            ammo_text = self.small_font.render("ARMA BRANCA", True, YELLOW)
-
-        self.screen.blit(weapon_text, (health_x, health_y + 75))
-        self.screen.blit(ammo_text, (health_x, health_y + 100))
-
-        # Score e combo
-        score_text = self.small_font.render(f"SCORE: {self.player.score}", True, WHITE)
-        combo_text = self.small_font.render(f"COMBO: x{self.player.combo}", True, YELLOW)
-        self.screen.blit(score_text, (health_x, health_y + 125))
-        self.screen.blit(combo_text, (health_x, health_y + 150))
-
-        # Nível e personagem
-        level_text = self.small_font.render(f"NÍVEL: {self.level_num}/29", True, WHITE)
-        char_text = self.small_font.render(f"PERSONAGEM: {self.player.character_type.name}", True,
-                                           BLUE if self.player.character_type == CharacterType.VETERAN else
-                                           GREEN if self.player.character_type == CharacterType.INVESTIGATOR else
-                                           RED if self.player.character_type == CharacterType.SUCCESSOR else
-                                           PURPLE if self.player.character_type == CharacterType.EXECUTIONER else
-                                           ORANGE)
-        self.screen.blit(level_text, (health_x, health_y + 175))
-        self.screen.blit(char_text, (health_x, health_y + 200))
-
-        # Habilidade
-        ability_text = "PRONTO"
-        ability_color = GREEN
-        if self.player.ability_cooldown > 0:
-            ability_text = f"RECARREGANDO: {self.player.ability_cooldown // 60 + 1}s"
-            ability_color = YELLOW
-
-        ability_surface = self.small_font.render(f"HABILIDADE (E): {ability_text}", True, ability_color)
-        self.screen.blit(ability_surface, (health_x, health_y + 225))
-
-        # Legado
-        legacy_text = self.small_font.render(f"PONTOS DE LEGADO: {self.player.legacy_points}", True, PURPLE)
-        self.screen.blit(legacy_text, (health_x, health_y + 250))
-
-        # Controles
-        controls = [
-            "WASD: MOVER",
-            "MOUSE ESQ: ATACAR",
-            "MOUSE DIR: EXECUTAR",
-            "E: HABILIDADE",
-            "Q/F: TROCAR ARMA",
-            "R: RECARREGAR"
-        ]
-
-        for i, control in enumerate(controls):
-            control_text = self.small_font.render(control, True, LIGHT_GRAY)
-            self.screen.blit(control_text, (SCREEN_WIDTH - 180, 20 + i * 25))
+            xs = np.fromiter((entity.x for entity in entities), float, count)
+            ys = np.fromiter((entity.y for entity in entities), float, count)
+        inside = np.flatnonzero((xs >= view.left) & (xs < view.right) & (ys >= view.top) & (ys < view.bottom))
+        visible = [entities[index] for index in inside.tolist()]
+        self.cull_stats[kind] = (len(visible), count - len(visible))
+        return visible
+
+    def cull_enemies(self, view):
+        # Inimigos vêm do hash espacial: só as células sob a câmera são visitadas, em ordem de lista
+        visible = self.level.enemy_grid.query(view.left, view.top, view.right, view.bottom)
+        self.cull_stats["enemies"] = (len(visible), len(self.level.enemies) - len(visible))
+        return visible
 
-        # Mensagem de habilidade
-        if self.message_timer > 0:
-            message_surface = self.font.render(self.message, True, YELLOW)
-            self.screen.blit(message_surface, (SCREEN_WIDTH // 2 - message_surface.get_width() // 2, 50))
+    def draw_hud(self):
+        self.hud.update(self)
+        self.hud.draw(self.screen, self)
 
     def draw_game_over(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
-        self.screen.blit(overlay, (0, 0))
-
-        game_over = self.title_font.render("GAME OVER", True, RED)
-        score = self.font.render(f"Score Final: {self.player.score}", True, WHITE)
-        level_info = self.small_font.render(f"Nível {self.level_num} - {self.player.character_type.name}", True, YELLOW)
-        restart = self.small_font.render("Pressione R para reiniciar ou M para menu", True, YELLOW)
-
-        self.screen.blit(game_over, (SCREEN_WIDTH // 2 - game_over.get_width() // 2, SCREEN_HEIGHT // 2 - 80))
-        self.screen.blit(score, (SCREEN_WIDTH // 2 - score.get_width() // 2, SCREEN_HEIGHT // 2 - 20))
-        self.screen.blit(level_info, (SCREEN_WIDTH // 2 - level_info.get_width() // 2, SCREEN_HEIGHT // 2 + 10))
-        self.screen.blit(restart, (SCREEN_WIDTH // 2 - restart.get_width() // 2, SCREEN_HEIGHT // 2 + 60))
+        self.screen.blit(self.shade, (0, 0))
+        self.draw_result_text([
+            (self.title_font, "GAME OVER", RED, SCREEN_HEIGHT // 2 - 80),
+            (self.font, f"Score Final: {self.player.score}", WHITE, SCREEN_HEIGHT // 2 - 20),
+            (self.small_font, f"Nível {self.level_num} - {self.player.character_type.name}", YELLOW,
+             SCREEN_HEIGHT // 2 + 10),
+            (self.small_font, "Pressione R para reiniciar ou M para menu", YELLOW, SCREEN_HEIGHT // 2 + 60),
+        ])
 
     def draw_level_complete(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
-        self.screen.blit(overlay, (0, 0))
-
-        complete = self.title_font.render("NÍVEL COMPLETO!", True, GREEN)
-        score = self.font.render(f"Score: {self.player.score}", True, WHITE)
-        next_level = self.small_font.render("Pressione R para o próximo nível ou M para menu", True, YELLOW)
-
-        self.screen.blit(complete, (SCREEN_WIDTH // 2 - complete.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-        self.screen.blit(score, (SCREEN_WIDTH // 2 - score.get_width() // 2, SCREEN_HEIGHT // 2))
-        self.screen.blit(next_level, (SCREEN_WIDTH // 2 - next_level.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
+        self.screen.blit(self.shade, (0, 0))
+        self.draw_result_text([
+            (self.title_font, "NÍVEL COMPLETO!", GREEN, SCREEN_HEIGHT // 2 - 50),
+            (self.font, f"Score: {self.player.score}", WHITE, SCREEN_HEIGHT // 2),
+            (self.small_font, "Pressione R para o próximo nível ou M para menu", YELLOW, SCREEN_HEIGHT // 2 + 50),
+        ])
+
+    def draw_result_text(self, lines):
+        # Renderizados uma vez por (estado, nível, personagem, score); os quadros seguintes só copiam
+        key = (self.state, self.level_num, self.player.character_type, self.player.score)
+        if key != self.result_key:
+            self.result_key = key
+            self.result_lines = []
+            for font, text, color, y in lines:
+                surface = font.render(text, True, color)
+                self.result_lines.append((surface, (SCREEN_WIDTH // 2 - surface.get_width() // 2, y)))
+        for surface, position in self.result_lines:
+            self.screen.blit(surface, position)
 
     def show_message(self, message):
         self.message = message
         self.message_timer = 120
 
-    def start_game(self, character_type):
+    def start_game(self, character_type, level_num=None):
+        # Sem level_num, começa no primeiro nível do capítulo do personagem
         self.player = Player(character_type)
-        self.level_num = self.character_progression[character_type][0]
-        self.level = Level(self.level_num, character_type, self.player.legacy_points)
+        self.level_num = self.character_progression[character_type][0] if level_num is None else level_num
+        self.level = Level(self.level_num, self.get_current_character(), self.player.legacy_points)
+        self.next_level_seed = None
         self.state = GameState.PLAYING
-        self.blood_particles = []
-        self.projectiles = []
-        self.grenades = []
+        self.blood_particles.clear()
+        self.projectiles.clear()
+        self.grenades.clear()
         self.slow_motion = False
 
         # Cutscene de introdução
@@ -1591,11 +3690,13 @@ class Game:
 
     def restart_level(self):
         self.player.reset()
-        self.level = Level(self.level_num, self.get_current_character(), self.player.legacy_points)
+        # Mesma semente: o reinício reaproveita o fundo já gerado
+        self.level = Level(self.level_num, self.get_current_character(), self.player.legacy_points,
+                           self.level.seed)
         self.state = GameState.PLAYING
-        self.blood_particles = []
-        self.projectiles = []
-        self.grenades = []
+        self.blood_particles.clear()
+        self.projectiles.clear()
+        self.grenades.clear()
 
     def next_level(self):
         if self.level_num < self.total_levels:
@@ -1610,8 +3711,13 @@ class Game:
                 if self.dialog_system.start_dialog("final"):
                     self.state = GameState.CUTSCENE
 
+            # Normalmente já foi construído em segundo plano durante a tela de resultado
             current_char = self.get_current_character()
-            self.level = Level(self.level_num, current_char, self.player.legacy_points)
+            if self.next_level_seed is None:
+                self.next_level_seed = random.getrandbits(32)
+            self.level = self.prefetcher.take(self.level_num, current_char, self.player.legacy_points,
+                                              self.next_level_seed)
+            self.next_level_seed = None
 
             # Reposicionar jogador
             self.player.x, self.player.y = self.level.spawn_point
@@ -1621,22 +3727,138 @@ class Game:
             self.state = GameState.MENU
 
     def run(self):
+        # Passo fixo com acumulador: o tempo real (escalado por time_scale) vira ticks de TICK_TIME;
+        # o desenho roda a cada quadro, interpolando entre o tick anterior e o atual
         running = True
+        accumulator = 0.0
+        previous = time.perf_counter()
         while running:
-            running = self.handle_events()
-            self.update()
-            self.draw()
-
-            # Controlar FPS baseado no slow motion
-            if self.slow_motion:
-                self.clock.tick(self.slow_fps)
-            else:
-                self.clock.tick(self.normal_fps)
+            now = time.perf_counter()
+            accumulator += min(now - previous, MAX_FRAME_TIME) * self.time_scale
+            previous = now
+
+            # Mantém a janela responsiva; os eventos ficam na fila até o próximo tick
+            pygame.event.pump()
+            if pygame.event.get((pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)):
+                # Janela redesenhada pelo sistema: a tela parada precisa ser apresentada inteira de novo
+                self.static_key = None
+            while running and accumulator >= TICK_TIME:
+                running = self.tick()
+                accumulator -= TICK_TIME
+
+            self.draw(accumulator / TICK_TIME)
+            self.profiler.end_frame(self)
+            self.clock.tick(self.render_fps)
 
         pygame.quit()
         sys.exit()
 
+    def run_headless(self, max_ticks, draw_every=0):
+        # Simulação sem limite de FPS: draw só a cada N ticks (0 = nunca)
+        ticks = 0
+        frames = 0
+        tick_total = 0.0
+        frame_total = 0.0
+        start = time.perf_counter()
+        while ticks < max_ticks:
+            if not self.tick():
+                break
+            ticks += 1
+            tick_total += self.tick_ms
+            if draw_every and ticks % draw_every == 0:
+                self.draw()
+                frames += 1
+                frame_total += self.frame_ms
+            self.profiler.end_frame(self)
+
+        elapsed = time.perf_counter() - start
+        ticks_per_second = ticks / elapsed if elapsed > 0 else 0.0
+        tick_ms = tick_total / ticks if ticks else 0.0
+        frame_ms = frame_total / frames if frames else 0.0
+        print(f"HEADLESS: {ticks} ticks em {elapsed:.2f}s ({ticks_per_second:.1f} ticks/s, "
+              f"tick {tick_ms:.3f} ms, quadro {frame_ms:.3f} ms)")
+        return {"ticks": ticks, "seconds": elapsed, "ticks_per_second": ticks_per_second,
+                "tick_ms": tick_ms, "frame_ms": frame_ms}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hotline Miami 3: Aftermath")
+    parser.add_argument("--headless", action="store_true",
+                        help="simulação sem janela e sem limite de FPS")
+    # Sem default no parser: assim dá para saber se a opção foi passada sem --headless
+    parser.add_argument("--ticks", type=int,
+                        help="número de ticks simulados no modo headless (padrão: 3600)")
+    parser.add_argument("--draw-every", type=int,
+                        help="desenhar a cada N ticks no modo headless (padrão: 0 = nunca)")
+    parser.add_argument("--script", help="roteiro JSON de entrada para o modo headless")
+    parser.add_argument("--seed", type=int, help="semente da partida (padrão: aleatória)")
+    parser.add_argument("--record", metavar="ARQUIVO", help="gravar a partida num arquivo de replay")
+    parser.add_argument("--keyframe-interval", type=int, default=600,
+                        help="ticks entre keyframes de estado na gravação")
+    parser.add_argument("--replay", metavar="ARQUIVO", help="reproduzir um arquivo de replay")
+    parser.add_argument("--seek", type=int, help="tick inicial do replay")
+    parser.add_argument("--trace", metavar="ARQUIVO",
+                        help="gravar spans por tick em JSON trace-event (chrome://tracing, Perfetto)")
+    args = parser.parse_args(argv)
+    if args.record and args.replay:
+        parser.error("--record e --replay não podem ser usados juntos")
+    # Opções que seriam ignoradas em silêncio
+    if not args.headless:
+        for option, value in (("--script", args.script), ("--ticks", args.ticks), ("--draw-every", args.draw_every)):
+            if value is not None:
+                parser.error(f"{option} só vale com --headless")
+    if args.replay:
+        # O replay traz a própria entrada e roda até o fim da gravação
+        for option, value in (("--script", args.script), ("--ticks", args.ticks)):
+            if value is not None:
+                parser.error(f"{option} não pode ser usado com --replay")
+    elif args.seek is not None:
+        parser.error("--seek só vale com --replay")
+    args.ticks = 3600 if args.ticks is None else args.ticks
+    args.draw_every = args.draw_every or 0
+    args.seek = args.seek or 0
+    return args
+
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    args = parse_args()
+    if args.trace:
+        TRACER.enable()
+    seed = args.seed
+    replay_input = None
+    if args.replay:
+        replay_input = input_source = ReplayInput.from_file(args.replay)
+        seed = replay_input.replay.seed
+    elif args.headless:
+        if args.script:
+            input_source = ScriptedInput.from_file(args.script)
+        else:
+            # Sem roteiro: começa com o Veterano e deixa a simulação correr
+            input_source = ScriptedInput({"events": [[0, "key", "K_1"]]})
+    else:
+        input_source = PygameInput()
+
+    recorder = RecordingInput(input_source, args.record, args.keyframe_interval) if args.record else None
+    game = Game(recorder or input_source, seed)
+    if recorder:
+        recorder.attach(game)
+    if replay_input:
+        replay_input.attach(game)
+        if args.seek:
+            replay_input.seek(args.seek)
+
+    try:
+        if args.headless:
+            # Replays rodam até o fim da gravação, na velocidade máxima
+            game.run_headless(len(replay_input) if replay_input else args.ticks, args.draw_every)
+            pygame.quit()
+        else:
+            game.run()
+    finally:
+        if recorder:
+            recorder.close()
+        if args.trace:
+            print(f"TRACE: {TRACER.save(args.trace)} eventos em {args.trace}")
+        if replay_input and replay_input.verify:
+            print(f"REPLAY: {replay_input.checked} keyframes conferidos, "
+                  f"{len(replay_input.mismatches)} divergências {replay_input.mismatches[:5]}")